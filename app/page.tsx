@@ -52,6 +52,20 @@ export default function Home() {
     }
   }
 
+  // AI summary arrives after the analysis (polled in Step 2); ignore it if
+  // the user has since restarted or re-run the analysis
+  const handleSummaryReady = (requestId: string, summary: string) => {
+    setSafetyAnalysis((prev) =>
+      prev && prev.request_id === requestId
+        ? {
+            ...prev,
+            ai_summary: summary,
+            recommendedTime: prev.recommendedTime && { ...prev.recommendedTime, reason: summary },
+          }
+        : prev
+    )
+  }
+
   return (
     <main className="min-h-screen">
       {currentStep < 4 && (
@@ -76,6 +90,7 @@ export default function Home() {
           onBack={handleBack}
           adventureContext={adventureContext}
           onAnalysisComplete={handleAnalysisComplete}
+          onSummaryReady={handleSummaryReady}
         />
       )}
 
@@ -0,0 +1,248 @@
+"""Redis cache client with an in-process fallback, plus a local LRU cache."""
+from app.config import settings
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Hashable, Optional, Union
+import asyncio
+import logging
+import orjson
+import time
+
+try:
+    import redis.asyncio as redis
+except ImportError:  # Optional dependency - fall back to process-local storage
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryCache:
+    """
+    Process-local stand-in for the subset of the Redis API we use.
+    
+    Used when REDIS_URL is not configured (local development, single
+    worker deployments). Entries expire lazily on read.
+    """
+    
+    MAX_ENTRIES = 10_000
+    
+    def __init__(self):
+        self._data: dict[str, tuple[float, str]] = {}
+    
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self._data.pop(key, None)
+            return None
+        return value
+    
+    async def setex(self, key: str, ttl: int, value: Union[str, int]) -> None:
+        if len(self._data) >= self.MAX_ENTRIES:
+            self._evict()
+        self._data[key] = (time.monotonic() + ttl, str(value))
+    
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._data.pop(key, None)
+    
+    async def incr(self, key: str) -> int:
+        value = int(await self.get(key) or 0) + 1
+        self._data[key] = (float("inf"), str(value))
+        return value
+    
+    def _evict(self) -> None:
+        """Drop expired entries, then the oldest ones if still full."""
+        now = time.monotonic()
+        for key in [k for k, (exp, _) in self._data.items() if exp < now]:
+            del self._data[key]
+        while len(self._data) >= self.MAX_ENTRIES:
+            del self._data[next(iter(self._data))]
+
+
+class LRUCache:
+    """
+    Bounded process-local LRU cache with optional TTL.
+    
+    For hot lookups where even a Redis round-trip is too slow (e.g.
+    elevation by rounded coordinates). Not shared between workers.
+    """
+    
+    def __init__(self, maxsize: int, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+    
+    def set(self, key: Hashable, value: Any) -> None:
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else float("inf")
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+    
+    def clear(self) -> None:
+        self._data.clear()
+    
+    def stats(self) -> dict:
+        """Size and hit rate since startup (for health/status endpoints)."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None
+        }
+    
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class CacheClient:
+    """Singleton cache client wrapper (Redis if configured, else in-memory)."""
+    
+    _instance = None
+    
+    @classmethod
+    def get_client(cls):
+        """Get or create cache client instance."""
+        if cls._instance is None:
+            if settings.redis_url and redis is not None:
+                cls._instance = redis.from_url(settings.redis_url, decode_responses=True)
+                logger.info("Redis cache client initialized")
+            else:
+                if settings.redis_url:
+                    logger.warning("REDIS_URL set but redis package not installed, using in-memory cache")
+                cls._instance = MemoryCache()
+                logger.info("In-memory cache initialized")
+        return cls._instance
+
+
+def get_cache():
+    """Dependency for getting the cache client in routes."""
+    return CacheClient.get_client()
+
+
+async def coalesce(
+    inflight: dict[Hashable, asyncio.Task],
+    key: Hashable,
+    fetch: Callable[[], Awaitable[Any]]
+) -> Any:
+    """
+    Single-flight: concurrent callers with the same key share one fetch.
+    
+    The first caller starts the task; the rest await it. shield() keeps
+    one caller's timeout/cancellation from cancelling it for the others.
+    """
+    task = inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(fetch())
+        inflight[key] = task
+        task.add_done_callback(lambda _: inflight.pop(key, None))
+    return await asyncio.shield(task)
+
+
+@lru_cache(maxsize=1)
+def _format_hour(hour: int) -> str:
+    return time.strftime("%Y%m%d%H", time.gmtime(hour * 3600))
+
+
+def current_hour_key() -> str:
+    """Current UTC hour as YYYYmmddHH, formatted once per hour (for cache keys)."""
+    return _format_hour(int(time.time() // 3600))
+
+
+# Keys with a background refresh in flight, and strong refs to those tasks
+_refreshing: set[str] = set()
+_refresh_tasks: set[asyncio.Task] = set()
+
+# Cache misses being fetched, so concurrent misses share one fetch
+_inflight_misses: dict[str, asyncio.Task] = {}
+
+# Per-process copy of recent entries, so hot keys skip the shared-cache
+# round-trip and JSON decode. Age is checked against fetched_at on read
+_local_entries = LRUCache(maxsize=4096)
+
+
+async def _store(key: str, value: Any, hard_ttl: int) -> None:
+    entry = {"value": value, "fetched_at": time.time()}
+    _local_entries.set(key, entry)
+    await get_cache().setex(key, hard_ttl, orjson.dumps(entry).decode())
+
+
+async def _refresh(key: str, fetch: Callable[[], Awaitable[Any]], hard_ttl: int) -> None:
+    try:
+        value = await fetch()
+        if value is not None:
+            await _store(key, value, hard_ttl)
+    except Exception as e:
+        logger.warning(f"Background refresh failed for {key}: {e}")
+    finally:
+        _refreshing.discard(key)
+
+
+async def cached_fetch(
+    key: str,
+    fetch: Callable[[], Awaitable[Any]],
+    soft_ttl: int,
+    hard_ttl: int
+) -> Any:
+    """
+    Stale-while-revalidate wrapper around an async fetch.
+    
+    Fresh entries (younger than soft_ttl) are returned as-is. Stale entries
+    (up to hard_ttl) are returned immediately while a single background
+    task refreshes them. Misses await the fetch (one per key, shared by
+    concurrent callers); None results are not cached. Values must be
+    JSON-serializable. Entries are looked up in-process first, then in
+    the shared cache.
+    """
+    entry = _local_entries.get(key)
+    if entry is not None and time.time() - entry["fetched_at"] > hard_ttl:
+        entry = None
+    
+    if entry is None:
+        try:
+            cached = await get_cache().get(key)
+        except Exception as e:
+            logger.warning(f"Cache read failed for {key}: {e}")
+            cached = None
+        if cached is not None:
+            entry = orjson.loads(cached)
+            _local_entries.set(key, entry)
+    
+    if entry is not None:
+        if time.time() - entry["fetched_at"] > soft_ttl and key not in _refreshing:
+            _refreshing.add(key)
+            task = asyncio.create_task(_refresh(key, fetch, hard_ttl))
+            _refresh_tasks.add(task)
+            task.add_done_callback(_refresh_tasks.discard)
+        return entry["value"]
+    
+    async def fetch_and_store() -> Any:
+        value = await fetch()
+        if value is not None:
+            try:
+                await _store(key, value, hard_ttl)
+            except Exception as e:
+                logger.warning(f"Cache write failed for {key}: {e}")
+        return value
+    
+    return await coalesce(_inflight_misses, key, fetch_and_store)
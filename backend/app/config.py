@@ -20,6 +20,8 @@ class Settings(BaseSettings):
     # Supabase
     supabase_url: str
     supabase_key: str
+    # Direct Postgres connection (Supabase > Settings > Database)
+    postgres_dsn: Optional[str] = None
     
     # Google Earth Engine (para TEMPO & Sentinel-5P)
     google_cloud_project_id: Optional[str] = None
@@ -38,6 +40,9 @@ class Settings(BaseSettings):
     # OpenAI
     openai_api_key: str
     
+    # Redis (optional - in-memory cache is used when unset)
+    redis_url: Optional[str] = None
+    
     # API Settings
     api_prefix: str = "/api"
     allowed_origins: list[str] = [
@@ -1,8 +1,11 @@
-"""Supabase client initialization and helpers."""
+"""Database clients: Supabase (REST) and asyncpg pool (direct Postgres)."""
+from fastapi import HTTPException, Request
 from supabase import create_client, Client
 from app.config import settings
 from typing import Optional
+import asyncpg
 import logging
+import orjson
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +36,47 @@ def get_db() -> Client:
     return SupabaseClient.get_client()
 
 
+# Pool sizing: enough connections for concurrent requests without
+# exhausting the Supabase/Postgres connection limit
+POOL_MIN_SIZE = 5
+POOL_MAX_SIZE = 20
+
+
+async def _init_connection(conn: asyncpg.Connection) -> None:
+    """Decode json/jsonb columns to Python objects."""
+    for json_type in ("json", "jsonb"):
+        await conn.set_type_codec(
+            json_type,
+            encoder=lambda v: orjson.dumps(v).decode(),
+            decoder=orjson.loads,
+            schema="pg_catalog"
+        )
+
+
+async def create_pool() -> Optional[asyncpg.Pool]:
+    """Create the asyncpg pool, or None if POSTGRES_DSN is not configured."""
+    if not settings.postgres_dsn:
+        logger.warning("POSTGRES_DSN not configured, trips endpoints disabled")
+        return None
+    
+    pool = await asyncpg.create_pool(
+        dsn=settings.postgres_dsn,
+        min_size=POOL_MIN_SIZE,
+        max_size=POOL_MAX_SIZE,
+        init=_init_connection
+    )
+    logger.info("Postgres connection pool initialized")
+    return pool
+
+
+def get_pool(request: Request) -> asyncpg.Pool:
+    """Dependency for getting the asyncpg pool in routes."""
+    pool = getattr(request.app.state, "pool", None)
+    if pool is None:
+        raise HTTPException(status_code=503, detail="Database not configured")
+    return pool
+
+
 # TODO: Add helper functions for common database operations
 # Example:
 # async def save_trip(trip_data: dict) -> dict:
@@ -3,11 +3,76 @@ Air Quality Index (AQI) calculation utilities.
 
 Implements EPA AQI calculation for multiple pollutants including PM2.5 and NO2.
 """
+import bisect
 import logging
 from typing import Optional
 
 logger = logging.getLogger(__name__)
 
+# EPA PM2.5 breakpoints (μg/m³, 24-hour)
+# Format: (concentration_low, concentration_high, aqi_low, aqi_high)
+_PM25_BREAKPOINTS = (
+    (0.0, 12.0, 0, 50),        # Good
+    (12.1, 35.4, 51, 100),     # Moderate
+    (35.5, 55.4, 101, 150),    # Unhealthy for Sensitive Groups
+    (55.5, 150.4, 151, 200),   # Unhealthy
+    (150.5, 250.4, 201, 300),  # Very Unhealthy
+    (250.5, 500.4, 301, 500),  # Hazardous
+)
+
+# EPA NO2 breakpoints (ppb, 1-hour)
+_NO2_BREAKPOINTS = (
+    (0, 53, 0, 50),          # Good
+    (54, 100, 51, 100),      # Moderate
+    (101, 360, 101, 150),    # Unhealthy for Sensitive Groups
+    (361, 649, 151, 200),    # Unhealthy
+    (650, 1249, 201, 300),   # Very Unhealthy
+    (1250, 2049, 301, 500),  # Hazardous
+)
+
+# Upper bounds are sorted, so the band is found by binary search
+_PM25_HIGHS = tuple(bp[1] for bp in _PM25_BREAKPOINTS)
+_NO2_HIGHS = tuple(bp[1] for bp in _NO2_BREAKPOINTS)
+
+# Category i covers AQI values up to and including _AQI_CATEGORY_EDGES[i]
+_AQI_CATEGORY_EDGES = (50, 100, 150, 200, 300)
+_AQI_CATEGORIES = (
+    "Good",
+    "Moderate",
+    "Unhealthy for Sensitive Groups",
+    "Unhealthy",
+    "Very Unhealthy",
+    "Hazardous",
+)
+_AQI_COLORS = (
+    "#00E400",  # Green
+    "#FFFF00",  # Yellow
+    "#FF7E00",  # Orange
+    "#FF0000",  # Red
+    "#8F3F97",  # Purple
+    "#7E0023",  # Maroon
+)
+
+
+def _interpolate_aqi(concentration: float, breakpoints: tuple, highs: tuple) -> int:
+    """
+    Linear EPA interpolation within the band containing concentration.
+    
+    Values in the rounding gaps between bands (e.g. 12.05 μg/m³) belong to
+    the next band up. Off-scale values are clamped to 0 and 500; NaN
+    readings map to 0.
+    """
+    # NaN fails every comparison and would bisect past the last band (500)
+    if concentration != concentration or concentration < breakpoints[0][0]:
+        return 0
+    
+    i = bisect.bisect_left(highs, concentration)
+    if i == len(breakpoints):
+        return 500
+    
+    c_lo, c_hi, i_lo, i_hi = breakpoints[i]
+    return round((i_hi - i_lo) / (c_hi - c_lo) * (concentration - c_lo) + i_lo)
+
 
 def calculate_aqi_from_pm25(pm25: float) -> int:
     """
@@ -21,28 +86,7 @@ def calculate_aqi_from_pm25(pm25: float) -> int:
     Returns:
         AQI value (0-500+)
     """
-    # EPA PM2.5 breakpoints (μg/m³, 24-hour)
-    # Format: (concentration_low, concentration_high, aqi_low, aqi_high)
-    breakpoints = [
-        (0.0, 12.0, 0, 50),        # Good
-        (12.1, 35.4, 51, 100),     # Moderate
-        (35.5, 55.4, 101, 150),    # Unhealthy for Sensitive Groups
-        (55.5, 150.4, 151, 200),   # Unhealthy
-        (150.5, 250.4, 201, 300),  # Very Unhealthy
-        (250.5, 500.4, 301, 500),  # Hazardous
-    ]
-    
-    for c_lo, c_hi, i_lo, i_hi in breakpoints:
-        if c_lo <= pm25 <= c_hi:
-            # Linear interpolation formula
-            aqi = ((i_hi - i_lo) / (c_hi - c_lo)) * (pm25 - c_lo) + i_lo
-            return round(aqi)
-    
-    # Off the scale (>500.4 μg/m³)
-    if pm25 > 500.4:
-        return 500
-    
-    return 0
+    return _interpolate_aqi(pm25, _PM25_BREAKPOINTS, _PM25_HIGHS)
 
 
 def calculate_aqi_from_no2(no2_ppb: float) -> int:
@@ -57,28 +101,7 @@ def calculate_aqi_from_no2(no2_ppb: float) -> int:
     Returns:
         AQI value (0-500+)
     """
-    # EPA NO2 breakpoints (ppb, 1-hour)
-    # Format: (concentration_low, concentration_high, aqi_low, aqi_high)
-    breakpoints = [
-        (0, 53, 0, 50),          # Good
-        (54, 100, 51, 100),      # Moderate
-        (101, 360, 101, 150),    # Unhealthy for Sensitive Groups
-        (361, 649, 151, 200),    # Unhealthy
-        (650, 1249, 201, 300),   # Very Unhealthy
-        (1250, 2049, 301, 500),  # Hazardous
-    ]
-    
-    for c_lo, c_hi, i_lo, i_hi in breakpoints:
-        if c_lo <= no2_ppb <= c_hi:
-            # Linear interpolation formula
-            aqi = ((i_hi - i_lo) / (c_hi - c_lo)) * (no2_ppb - c_lo) + i_lo
-            return round(aqi)
-    
-    # Off the scale (>2049 ppb)
-    if no2_ppb > 2049:
-        return 500
-    
-    return 0
+    return _interpolate_aqi(no2_ppb, _NO2_BREAKPOINTS, _NO2_HIGHS)
 
 
 def calculate_aqi_from_pollutants(pm25: Optional[float], no2: Optional[float]) -> tuple[int, str]:
@@ -100,12 +123,12 @@ def calculate_aqi_from_pollutants(pm25: Optional[float], no2: Optional[float]) -
     if pm25 is not None and pm25 >= 0:
         pm25_aqi = calculate_aqi_from_pm25(pm25)
         aqi_values.append((pm25_aqi, "pm25"))
-        logger.debug(f"PM2.5: {pm25:.1f} μg/m³ → AQI {pm25_aqi}")
+        logger.debug("PM2.5: %.1f μg/m³ → AQI %s", pm25, pm25_aqi)
     
     if no2 is not None and no2 >= 0:
         no2_aqi = calculate_aqi_from_no2(no2)
         aqi_values.append((no2_aqi, "no2"))
-        logger.debug(f"NO2: {no2:.1f} ppb → AQI {no2_aqi}")
+        logger.debug("NO2: %.1f ppb → AQI %s", no2, no2_aqi)
     
     if not aqi_values:
         # No valid pollutants - return conservative estimate
@@ -129,18 +152,7 @@ def get_aqi_category(aqi: int) -> str:
     Returns:
         Category name
     """
-    if aqi <= 50:
-        return "Good"
-    elif aqi <= 100:
-        return "Moderate"
-    elif aqi <= 150:
-        return "Unhealthy for Sensitive Groups"
-    elif aqi <= 200:
-        return "Unhealthy"
-    elif aqi <= 300:
-        return "Very Unhealthy"
-    else:
-        return "Hazardous"
+    return _AQI_CATEGORIES[bisect.bisect_left(_AQI_CATEGORY_EDGES, aqi)]
 
 
 def get_aqi_color(aqi: int) -> str:
@@ -153,18 +165,7 @@ def get_aqi_color(aqi: int) -> str:
     Returns:
         Hex color code
     """
-    if aqi <= 50:
-        return "#00E400"  # Green
-    elif aqi <= 100:
-        return "#FFFF00"  # Yellow
-    elif aqi <= 150:
-        return "#FF7E00"  # Orange
-    elif aqi <= 200:
-        return "#FF0000"  # Red
-    elif aqi <= 300:
-        return "#8F3F97"  # Purple
-    else:
-        return "#7E0023"  # Maroon
+    return _AQI_COLORS[bisect.bisect_left(_AQI_CATEGORY_EDGES, aqi)]
 
 
 __all__ = [
@@ -319,10 +319,10 @@ def calculate_weather_score(weather: dict) -> float:
     # Use heat index when hot and humid, wind chill when cold and windy
     if temp_c > 26 and humidity > 40:
         apparent_temp = calculate_heat_index(temp_c, humidity)
-        logger.debug(f"Using heat index: {temp_c}°C feels like {apparent_temp:.1f}°C (humidity {humidity}%)")
+        logger.debug("Using heat index: %s°C feels like %.1f°C (humidity %s%%)", temp_c, apparent_temp, humidity)
     elif temp_c < 10 and wind_speed_kmh > 5:
         apparent_temp = calculate_wind_chill(temp_c, wind_speed_kmh)
-        logger.debug(f"Using wind chill: {temp_c}°C feels like {apparent_temp:.1f}°C (wind {wind_speed_kmh} km/h)")
+        logger.debug("Using wind chill: %s°C feels like %.1f°C (wind %s km/h)", temp_c, apparent_temp, wind_speed_kmh)
     else:
         apparent_temp = temp_c
     
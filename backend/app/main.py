@@ -1,7 +1,7 @@
 """FastAPI main application entry point."""
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
 import logging
 import uuid
@@ -9,6 +9,9 @@ import time
 
 from app.config import settings
 from app.routes import analyze, forecast, trips
+from app.services.http import create_http_client
+from app.services.earth_engine_service import shutdown_executor as shutdown_ee_executor
+from app.database import create_pool
 
 # Configure logging
 logging.basicConfig(
@@ -25,13 +28,21 @@ async def lifespan(app: FastAPI):
     logger.info(f"Starting {settings.app_name} v{settings.version}")
     logger.info(f"Environment: {settings.environment}")
     
-    # TODO: Initialize any async resources here (e.g., httpx client pool)
+    # Shared HTTP client - one connection pool for all outbound API calls
+    app.state.http = create_http_client()
+    # Strong references to fire-and-forget tasks (e.g. AI summaries)
+    app.state.background_tasks = set()
+    # Postgres pool for trips (None when POSTGRES_DSN is unset)
+    app.state.pool = await create_pool()
     
     yield
     
     # Shutdown
     logger.info(f"Shutting down {settings.app_name}")
-    # TODO: Cleanup resources here
+    await app.state.http.aclose()
+    shutdown_ee_executor()
+    if app.state.pool is not None:
+        await app.state.pool.close()
 
 
 # Initialize FastAPI app
@@ -41,6 +52,7 @@ app = FastAPI(
     description="Air quality and outdoor safety analysis API",
     docs_url="/docs" if settings.debug else None,
     redoc_url="/redoc" if settings.debug else None,
+    default_response_class=ORJSONResponse,  # orjson: much faster than stdlib json
     lifespan=lifespan
 )
 
@@ -96,7 +108,7 @@ async def global_exception_handler(request: Request, exc: Exception):
         exc_info=True
     )
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         content={
             "error": "Internal server error",
@@ -152,5 +164,7 @@ if __name__ == "__main__":
         "app.main:app",
         host="0.0.0.0",
         port=8000,
-        reload=settings.debug
+        reload=settings.debug,
+        # uvloop when installed (uvicorn[standard], non-Windows), asyncio otherwise
+        loop="auto"
     )
@@ -1,12 +1,17 @@
 """Main analysis endpoint."""
 from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Any, Awaitable, Callable, Optional, List
 from datetime import datetime
 import asyncio
+import bisect
 import logging
+import time
+import msgspec
 
-from app.services.earth_engine_service import fetch_earth_engine_no2
+from app.cache import cached_fetch, current_hour_key, get_cache
+from app.services.earth_engine_service import EarthEngineService, fetch_earth_engine_no2
 from app.services.openaq import fetch_openaq_data
 from app.services.weather import fetch_weather_forecast
 from app.services.elevation import fetch_elevation
@@ -69,6 +74,12 @@ class OverallSafetyResponse(BaseModel):
     overall: float
 
 
+class AISummaryResponse(BaseModel):
+    """Background AI summary status."""
+    ready: bool
+    summary: Optional[str] = None
+
+
 class AnalyzeResponse(BaseModel):
     """Complete analysis response."""
     request_id: str
@@ -86,9 +97,113 @@ class AnalyzeResponse(BaseModel):
     generated_at: str
 
 
+# ===== Response Structs (hot path) =====
+# msgspec mirrors of the response models above, used to type-check and
+# encode the analyze response. Field parity is checked in test_logic.py
+
+class AirQualityStruct(msgspec.Struct):
+    aqi: int
+    category: str
+    pm25: float
+    no2: float
+    dominant_pollutant: str
+
+
+class WeatherHourStruct(msgspec.Struct):
+    timestamp: str
+    temp_c: float
+    humidity: int
+    wind_speed_kmh: float
+    wind_direction: int
+    uv_index: float
+    precipitation_mm: float
+    cloud_cover: int
+
+
+class ChecklistItemStruct(msgspec.Struct):
+    item: str
+    required: bool
+    reason: str
+    category: str
+
+
+class OverallSafetyStruct(msgspec.Struct):
+    environmental: float
+    health: float
+    terrain: float
+    overall: float
+
+
+class AnalyzeResponseStruct(msgspec.Struct):
+    request_id: str
+    risk_score: float
+    category: str
+    overallSafety: OverallSafetyStruct
+    air_quality: AirQualityStruct
+    weather_forecast: List[WeatherHourStruct]
+    elevation: dict
+    checklist: List[ChecklistItemStruct]
+    warnings: List[str]
+    ai_summary: str
+    risk_factors: List[dict]
+    data_sources: List[str]
+    generated_at: str
+
+
+_response_encoder = msgspec.json.Encoder()
+
+
 # Removed - now using app.logic.aqi module
 
 
+# Terrain breakdown score by elevation band: <1000m, <2000m, <3000m, above
+_TERRAIN_EDGES = (1000, 2000, 3000)
+_TERRAIN_SCORES = (9.0, 7.5, 6.0, 4.5)
+
+
+# Cache key and lifetime for background-generated AI summaries
+AI_SUMMARY_KEY = "aisum:req:{request_id}"
+AI_SUMMARY_TTL = 3600
+
+
+# Per-source fetch timeouts (seconds); a source that exceeds its budget
+# falls back to the canned defaults below instead of stalling the request
+FETCH_TIMEOUTS = {
+    "tempo": 8.0,
+    "openaq": 6.0,
+    "weather": 4.0,
+    "elevation": 4.0,
+}
+
+
+# (soft_ttl, hard_ttl) in seconds: past soft_ttl a cached value is still
+# served but refreshed in the background; past hard_ttl it is dropped.
+# Weather keys also carry the UTC hour, since its first entry is used as
+# the current conditions. TEMPO is not listed: the Earth Engine service
+# already caches per dataset with TTLs matching each product's cadence.
+SOURCE_CACHE_TTLS = {
+    "openaq": (900, 6 * 3600),
+    "weather": (900, 3600),
+}
+
+
+def _cached_source(source: str, key_suffix: str, fetch: Callable[[], Awaitable[Any]]) -> Awaitable[Any]:
+    """Wrap a source fetch in the shared stale-while-revalidate cache."""
+    soft_ttl, hard_ttl = SOURCE_CACHE_TTLS[source]
+    return cached_fetch(f"src:{source}:{key_suffix}", fetch, soft_ttl, hard_ttl)
+
+
+async def _fetch_or_none(coro: Awaitable, source: str, request_id: str) -> Any:
+    """Await a data-source fetch with its timeout, returning None on any failure."""
+    try:
+        return await asyncio.wait_for(coro, timeout=FETCH_TIMEOUTS[source])
+    except asyncio.TimeoutError:
+        logger.warning(f"[{request_id}] {source} fetch timed out after {FETCH_TIMEOUTS[source]}s")
+    except Exception as e:
+        logger.warning(f"[{request_id}] {source} fetch failed: {e}")
+    return None
+
+
 async def generate_ai_summary(
     request: AnalyzeRequest,
     risk_data: dict,
@@ -148,45 +263,67 @@ Required Gear Items: {sum(1 for item in checklist if item['required'])}
         return generate_fallback_summary(risk_data, air_quality, weather)
 
 
+async def _store_ai_summary(
+    request_id: str,
+    request: AnalyzeRequest,
+    risk_data: dict,
+    checklist: List[dict],
+    air_quality: dict,
+    weather: dict
+) -> None:
+    """Generate the AI summary off the hot path and cache it under the request ID."""
+    summary = await generate_ai_summary(request, risk_data, checklist, air_quality, weather)
+    try:
+        await get_cache().setex(AI_SUMMARY_KEY.format(request_id=request_id), AI_SUMMARY_TTL, summary)
+    except Exception as e:
+        logger.warning(f"[{request_id}] Failed to store AI summary: {e}")
+
+
+# Data-source flags and the fixed source list for each combination
+_SRC_TEMPO = 1
+_SRC_TEMPO_ESTIMATED = 2
+_SRC_OPENAQ_NO2 = 4
+_SRC_OPENAQ_PM25 = 8
+
+_ALWAYS_SOURCES = ("Open-Meteo weather API", "Open-Elevation terrain API")
+
+_SRC_TABLE = {
+    0: _ALWAYS_SOURCES,
+    _SRC_TEMPO: ("NASA TEMPO satellite (NO2)",) + _ALWAYS_SOURCES,
+    _SRC_TEMPO_ESTIMATED: ("NASA TEMPO satellite (NO2 estimated)",) + _ALWAYS_SOURCES,
+    _SRC_OPENAQ_NO2: ("OpenAQ ground stations (NO2)",) + _ALWAYS_SOURCES,
+    _SRC_OPENAQ_PM25: ("OpenAQ ground stations (PM2.5)",) + _ALWAYS_SOURCES,
+    _SRC_TEMPO | _SRC_OPENAQ_PM25: (
+        "NASA TEMPO satellite (NO2)", "OpenAQ ground stations (PM2.5)"
+    ) + _ALWAYS_SOURCES,
+    _SRC_TEMPO_ESTIMATED | _SRC_OPENAQ_PM25: (
+        "NASA TEMPO satellite (NO2 estimated)", "OpenAQ ground stations (PM2.5)"
+    ) + _ALWAYS_SOURCES,
+    _SRC_OPENAQ_NO2 | _SRC_OPENAQ_PM25: ("OpenAQ ground stations (NO2, PM2.5)",) + _ALWAYS_SOURCES,
+}
+
+
 def _build_data_sources_list(tempo_data: Optional[dict], openaq_data: Optional[dict], no2_source: Optional[str]) -> List[str]:
     """
     Build list of data sources used for this analysis.
     
     Clearly indicates which sources provided actual data vs fallbacks.
     Shows NASA TEMPO when satellite data was used, OpenAQ for ground measurements.
+    Fallback estimates are not listed - they're not a real data source.
     """
-    sources = []
+    flags = 0
     
     # NO2 source (TEMPO or OpenAQ or fallback)
     if tempo_data and tempo_data.get("no2_ppb") is not None:
-        quality = tempo_data.get("quality_flag", 0)
-        if quality == 0:
-            sources.append("NASA TEMPO satellite (NO2)")
-        else:
-            sources.append("NASA TEMPO satellite (NO2 estimated)")
-    elif "OpenAQ" in str(no2_source):
-        sources.append("OpenAQ ground stations (NO2)")
-    elif "Fallback" in str(no2_source):
-        # Don't add fallback to sources - it's not a real data source
-        pass
+        flags = _SRC_TEMPO if tempo_data.get("quality_flag", 0) == 0 else _SRC_TEMPO_ESTIMATED
+    elif no2_source and no2_source.startswith("OpenAQ"):
+        flags = _SRC_OPENAQ_NO2
     
     # PM2.5 source (always OpenAQ, TEMPO doesn't measure particles)
     if openaq_data and openaq_data.get("pm25") is not None:
-        # Only add if not already mentioned
-        if not any("OpenAQ" in s for s in sources):
-            sources.append("OpenAQ ground stations (PM2.5)")
-        elif "OpenAQ ground stations (NO2)" in sources:
-            # Replace with combined
-            sources = [s for s in sources if s != "OpenAQ ground stations (NO2)"]
-            sources.append("OpenAQ ground stations (NO2, PM2.5)")
-    
-    # Weather and elevation (always used)
-    sources.extend([
-        "Open-Meteo weather API",
-        "Open-Elevation terrain API"
-    ])
+        flags |= _SRC_OPENAQ_PM25
     
-    return sources
+    return list(_SRC_TABLE[flags])
 
 
 def generate_fallback_summary(risk_data: dict, air_quality: dict, weather: dict) -> str:
@@ -219,7 +356,7 @@ async def analyze_adventure(request: Request, req: AnalyzeRequest):
     5. Calculate AQI
     6. Calculate risk score
     7. Generate checklist
-    8. Generate AI summary
+    8. Schedule AI summary (fallback summary returned immediately)
     9. Return complete analysis
     """
     request_id = getattr(request.state, "request_id", "unknown")
@@ -229,24 +366,47 @@ async def analyze_adventure(request: Request, req: AnalyzeRequest):
     )
     
     try:
-        start_time = datetime.utcnow()
+        start_time = time.perf_counter()
+        now_iso = datetime.utcnow().isoformat()
         
         # Step 1: Fetch all data in parallel for optimal performance
         logger.info(f"[{request_id}] Fetching data from all sources...")
         
-        tempo_task = fetch_earth_engine_no2(req.lat, req.lon)
-        openaq_task = fetch_openaq_data(req.lat, req.lon, radius_km=25)
-        weather_task = fetch_weather_forecast(req.lat, req.lon, hours=req.duration_hours)
-        elevation_task = fetch_elevation(req.lat, req.lon)
-        
-        # Gather all data (None if any service fails)
-        tempo_data, openaq_data, weather_data, elevation_data = await asyncio.gather(
-            tempo_task,
-            openaq_task,
-            weather_task,
-            elevation_task,
-            return_exceptions=False
-        )
+        # Shared app-lifetime client (connection pooling + HTTP/2)
+        http = request.app.state.http
+        
+        # Each source is bounded by its own timeout and resolves to None on
+        # failure, so one slow API can't stall or cancel the others
+        # Cached sources are served stale-while-revalidate (see SOURCE_CACHE_TTLS)
+        cell = f"{round(req.lat, 2)}:{round(req.lon, 2)}"
+        async with asyncio.TaskGroup() as tg:
+            tempo_task = tg.create_task(_fetch_or_none(
+                fetch_earth_engine_no2(req.lat, req.lon),
+                "tempo", request_id
+            ))
+            openaq_task = tg.create_task(_fetch_or_none(
+                _cached_source(
+                    "openaq", cell,
+                    lambda: fetch_openaq_data(req.lat, req.lon, radius_km=25, client=http)
+                ),
+                "openaq", request_id
+            ))
+            weather_task = tg.create_task(_fetch_or_none(
+                _cached_source(
+                    "weather", f"{cell}:{req.duration_hours}:{current_hour_key()}",
+                    lambda: fetch_weather_forecast(req.lat, req.lon, hours=req.duration_hours, client=http)
+                ),
+                "weather", request_id
+            ))
+            elevation_task = tg.create_task(_fetch_or_none(
+                fetch_elevation(req.lat, req.lon, client=http),
+                "elevation", request_id
+            ))
+        
+        tempo_data = tempo_task.result()
+        openaq_data = openaq_task.result()
+        weather_data = weather_task.result()
+        elevation_data = elevation_task.result()
         
         logger.info(f"[{request_id}] Data fetched successfully")
         
@@ -262,7 +422,7 @@ async def analyze_adventure(request: Request, req: AnalyzeRequest):
         if weather_data is None or len(weather_data) == 0:
             logger.warning(f"[{request_id}] Weather data unavailable, using fallback")
             weather_data = [{
-                "timestamp": datetime.utcnow().isoformat(),
+                "timestamp": now_iso,
                 "temp_c": 20.0,
                 "humidity": 50,
                 "wind_speed_kmh": 10.0,
@@ -330,16 +490,25 @@ async def analyze_adventure(request: Request, req: AnalyzeRequest):
         
         logger.info(f"[{request_id}] Calculated AQI: {aqi} ({aqi_category}), dominant: {dominant_pollutant}")
         
-        # Step 4: Calculate risk score
+        # Canonical values shared by risk, checklist, summary and response
         current_weather = weather_data[0]
+        pm25_value = pm25 if pm25 is not None else 15.0
+        no2_value = no2_ppb if no2_ppb is not None else 20.0
+        uv_index = current_weather.get("uv_index", 5.0)
+        elevation_m = elevation_data.get("elevation_m")
+        if elevation_m is None:
+            elevation_m = 100  # Default lowland
+        elevation_int = int(elevation_m)
+        
+        # Step 4: Calculate risk score
         risk_input = {
             "activity": req.activity,
             "aqi": aqi,
-            "pm25": pm25 if pm25 is not None else 15.0,
-            "no2": no2_ppb if no2_ppb is not None else 20.0,
+            "pm25": pm25_value,
+            "no2": no2_value,
             "weather": current_weather,
-            "elevation": int(elevation_data.get("elevation_m", 100)),
-            "uv_index": current_weather.get("uv_index", 5.0)
+            "elevation": elevation_int,
+            "uv_index": uv_index
         }
         
         risk_data = calculate_safety_score(risk_input)
@@ -348,10 +517,10 @@ async def analyze_adventure(request: Request, req: AnalyzeRequest):
         # Step 5: Generate checklist
         checklist_input = {
             "aqi": aqi,
-            "pm25": pm25 if pm25 is not None else 15.0,
-            "no2": no2_ppb if no2_ppb is not None else 20.0,
-            "uv_index": current_weather.get("uv_index", 5.0),
-            "elevation": int(elevation_data.get("elevation_m", 100))
+            "pm25": pm25_value,
+            "no2": no2_value,
+            "uv_index": uv_index,
+            "elevation": elevation_int
         }
         
         checklist = generate_checklist(
@@ -365,119 +534,93 @@ async def analyze_adventure(request: Request, req: AnalyzeRequest):
         air_quality_dict = {
             "aqi": aqi,
             "category": aqi_category,
-            "pm25": pm25 if pm25 is not None else 15.0,
-            "no2": no2_ppb if no2_ppb is not None else 20.0
+            "pm25": pm25_value,
+            "no2": no2_value
         }
         
-        ai_summary = await generate_ai_summary(
+        # Respond with the template summary now; the OpenAI summary is
+        # generated in the background and polled via /analyze/{id}/summary
+        ai_summary = generate_fallback_summary(risk_data, air_quality_dict, current_weather)
+        
+        task = asyncio.create_task(_store_ai_summary(
+            request_id,
             req,
             risk_data,
             checklist,
             air_quality_dict,
             current_weather
-        )
+        ))
+        background_tasks = request.app.state.background_tasks
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
         
-        # Step 7: Calculate detailed safety breakdown with null safety
-        try:
-            # Safe extraction with null checks
-            aqi_value = None
-            if openaq_data and openaq_data.get("pm25") is not None:
-                aqi_value = openaq_data.get("pm25")
-            else:
-                aqi_value = 50  # Default moderate
-            
-            elevation_m = None
-            if elevation_data and elevation_data.get("elevation_m") is not None:
-                elevation_m = elevation_data.get("elevation_m")
-            else:
-                elevation_m = 100  # Default lowland
-            
-            # Environmental score based on AQI (inverse relationship)
-            # Ensure aqi_value is not None before math
-            if aqi_value is not None:
-                environmental_score = max(0, min(10, (100 - aqi_value) / 10))
-            else:
-                environmental_score = 8.0
-            
-            # Health score from risk calculation
-            # Ensure risk_data["score"] exists and is not None
-            health_score = risk_data.get("score", 8.0)
-            if health_score is None:
-                health_score = 8.0
-            
-            # Terrain score based on elevation and activity
-            # Ensure elevation_m is not None
-            if elevation_m is not None:
-                if elevation_m < 1000:
-                    terrain_score = 9.0
-                elif elevation_m < 2000:
-                    terrain_score = 7.5
-                elif elevation_m < 3000:
-                    terrain_score = 6.0
-                else:
-                    terrain_score = 4.5
-            else:
-                terrain_score = 8.0
-            
-            # Overall score (weighted average)
-            overall_score = (environmental_score * 0.3 + health_score * 0.5 + terrain_score * 0.2)
-            
-            overall_safety = OverallSafetyResponse(
-                environmental=round(environmental_score, 1),
-                health=round(health_score, 1),
-                terrain=round(terrain_score, 1),
-                overall=round(overall_score, 1)
-            )
-            
-            logger.info(
-                f"[{request_id}] Safety breakdown: env={overall_safety.environmental}, "
-                f"health={overall_safety.health}, terrain={overall_safety.terrain}"
-            )
-            
-        except Exception as e:
-            logger.error(f"[{request_id}] Safety calculation failed: {e}, using fallback values")
-            # Fallback to safe default values
-            overall_safety = OverallSafetyResponse(
-                environmental=8.0,
-                health=8.0,
-                terrain=8.0,
-                overall=8.0
-            )
+        # Step 7: Calculate detailed safety breakdown
+        aqi_value = pm25 if pm25 is not None else 50  # Default moderate
+        
+        # Environmental score based on AQI (inverse relationship)
+        environmental_score = max(0.0, min(10.0, (100.0 - aqi_value) * 0.1))
+        
+        # Health score from risk calculation
+        health_score = risk_data.get("score")
+        if health_score is None:
+            health_score = 8.0
+        
+        # Terrain score based on elevation band
+        terrain_score = _TERRAIN_SCORES[bisect.bisect_right(_TERRAIN_EDGES, elevation_m)]
+        
+        # Overall score (weighted average)
+        overall_score = 0.3 * environmental_score + 0.5 * health_score + 0.2 * terrain_score
+        
+        overall_safety = {
+            "environmental": round(environmental_score, 1),
+            "health": round(health_score, 1),
+            "terrain": round(terrain_score, 1),
+            "overall": round(overall_score, 1)
+        }
+        
+        logger.info(
+            f"[{request_id}] Safety breakdown: env={overall_safety['environmental']}, "
+            f"health={overall_safety['health']}, terrain={overall_safety['terrain']}"
+        )
         
         # Step 8: Build complete response
-        response = AnalyzeResponse(
-            request_id=request_id,
-            risk_score=risk_data["score"],
-            category=risk_data["category"],
-            overallSafety=overall_safety,
-            air_quality=AirQualityResponse(
-                aqi=aqi,
-                category=aqi_category,
-                pm25=pm25 if pm25 is not None else 15.0,
-                no2=no2_ppb if no2_ppb is not None else 20.0,
-                dominant_pollutant=dominant_pollutant
-            ),
-            weather_forecast=[
-                WeatherHourResponse(**hour) for hour in weather_data[:24]
-            ],
-            elevation=elevation_data,
-            checklist=[
-                ChecklistItemResponse(**item) for item in checklist
-            ],
-            warnings=risk_data["warnings"],
-            ai_summary=ai_summary,
-            risk_factors=risk_data["risk_factors"],
-            data_sources=_build_data_sources_list(tempo_data, openaq_data, no2_source),
-            generated_at=datetime.utcnow().isoformat()
+        # msgspec.convert type-checks every field like Pydantic's lax mode
+        # (nulls and non-numeric values raise, extra dict keys are ignored)
+        # and the struct is encoded directly, skipping FastAPI's
+        # jsonable_encoder pass. response_model still documents the schema
+        response = msgspec.convert(
+            {
+                "request_id": request_id,
+                "risk_score": risk_data["score"],
+                "category": risk_data["category"],
+                "overallSafety": overall_safety,
+                "air_quality": {
+                    "aqi": aqi,
+                    "category": aqi_category,
+                    "pm25": pm25_value,
+                    "no2": no2_value,
+                    "dominant_pollutant": dominant_pollutant
+                },
+                "weather_forecast": weather_data[:24],
+                "elevation": elevation_data,
+                "checklist": checklist,
+                "warnings": risk_data["warnings"],
+                "ai_summary": ai_summary,
+                "risk_factors": risk_data["risk_factors"],
+                "data_sources": _build_data_sources_list(tempo_data, openaq_data, no2_source),
+                "generated_at": now_iso
+            },
+            type=AnalyzeResponseStruct,
+            strict=False
         )
         
-        elapsed = (datetime.utcnow() - start_time).total_seconds()
+        elapsed = time.perf_counter() - start_time
         logger.info(
             f"[{request_id}] Analysis complete in {elapsed:.2f}s: "
             f"score={response.risk_score}/10, warnings={len(response.warnings)}"
         )
         
-        return response
+        return Response(content=_response_encoder.encode(response), media_type="application/json")
         
     except asyncio.TimeoutError:
         logger.error(f"[{request_id}] Analysis timed out")
@@ -493,11 +636,30 @@ async def analyze_adventure(request: Request, req: AnalyzeRequest):
         )
 
 
+@router.get("/analyze/{request_id}/summary", response_model=AISummaryResponse)
+async def get_ai_summary(request_id: str):
+    """
+    Poll for the AI summary of a previous analysis.
+    
+    Returns ready=False until the background OpenAI call has finished.
+    The summary is handed over through the app cache, so deployments with
+    more than one worker need REDIS_URL set: the in-memory fallback is
+    per-process and a poll landing on another worker never sees it.
+    """
+    try:
+        summary = await get_cache().get(AI_SUMMARY_KEY.format(request_id=request_id))
+    except Exception as e:
+        logger.warning(f"[{request_id}] Failed to read AI summary: {e}")
+        summary = None
+    return AISummaryResponse(ready=summary is not None, summary=summary)
+
+
 @router.get("/health")
 async def health_check():
     """Health check for analyze service."""
     return {
         "status": "healthy",
         "service": "analyze",
-        "endpoints": ["/api/analyze"]
+        "endpoints": ["/api/analyze", "/api/analyze/{request_id}/summary"],
+        "no2_cache": EarthEngineService.cache_stats()
     }
@@ -3,13 +3,21 @@ from fastapi import APIRouter, HTTPException, Request
 from app.models.schemas import ForecastRequest, ForecastResponse
 from app.services.openaq import OpenAQService
 from app.services.weather import WeatherService
+from app.services.elevation import ElevationService
+from app.services.geocoding import GeocodingService
 from app.logic.risk_score import RiskScoreCalculator
+from app.cache import current_hour_key, get_cache
 from datetime import datetime, timedelta
+import asyncio
 import logging
+import orjson
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Forecasts change hourly at best; the key includes the UTC hour bucket
+FORECAST_CACHE_TTL = 1800
+
 
 @router.get("/forecast", response_model=ForecastResponse)
 async def get_forecast(
@@ -32,30 +40,61 @@ async def get_forecast(
     if days < 1 or days > 14:
         raise HTTPException(status_code=400, detail="Days must be between 1 and 14")
     
+    cache = get_cache()
+    cache_key = (
+        f"forecast:{round(lat, 2)}:{round(lon, 2)}:{days}:"
+        f"{current_hour_key()}"
+    )
+    # Clients can force a refresh with "Cache-Control: no-cache"
+    bypass_cache = "no-cache" in request.headers.get("cache-control", "")
+    
+    if not bypass_cache:
+        try:
+            cached = await cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"[{request_id}] Forecast cache hit: {cache_key}")
+                return orjson.loads(cached)
+        except Exception as e:
+            logger.warning(f"[{request_id}] Forecast cache read failed: {e}")
+    
     try:
         # Initialize services
-        weather_service = WeatherService()
-        openaq_service = OpenAQService()
+        weather_service = WeatherService(client=request.app.state.http)
+        openaq_service = OpenAQService(client=request.app.state.http)
+        elevation_service = ElevationService(client=request.app.state.http)
+        geocoding_service = GeocodingService(client=request.app.state.http)
         risk_calculator = RiskScoreCalculator()
         
-        # Fetch weather forecast
-        logger.info(f"[{request_id}] Fetching weather forecast...")
-        weather_forecast = await weather_service.get_forecast(lat, lon, days)
+        # Weather forecast, historical AQ, elevation and place name are
+        # independent - fetch them at once so the request costs the slowest
+        # rather than the sum
+        logger.info(f"[{request_id}] Fetching weather forecast, historical AQ, elevation and place...")
+        # TODO: historical AQ is still mocked (trend prediction)
+        weather_forecast, historical_aq, elevation_data, place = await asyncio.gather(
+            weather_service.get_forecast(lat, lon, days),
+            openaq_service.get_historical_data(lat, lon, days=7),
+            elevation_service.get_elevation(lat, lon),
+            geocoding_service.reverse_geocode(lat, lon)
+        )
+        # Reverse geocoding returns None on failure; the forecast doesn't need it
+        place = place or {}
         
-        # TODO: Fetch historical AQ data for trend prediction
-        historical_aq = await openaq_service.get_historical_data(lat, lon, days=7)
+        # Historical baseline is the same for every day - compute it once
+        if historical_aq:
+            base_avg = sum(h.get("aqi_avg", 50) for h in historical_aq) / len(historical_aq)
+        else:
+            base_avg = 50.0
         
         # Build forecast response
         forecast_days = []
         for day_data in weather_forecast:
             # TODO: Predict AQI based on weather and historical patterns
             # For now, use historical average
-            predicted_aqi = self._predict_aqi(day_data, historical_aq)
+            predicted_aqi = _predict_aqi(day_data, base_avg)
             
             # Calculate safety score for the day
             mock_aq_data = {"aqi": predicted_aqi, "pm25": predicted_aqi * 0.3}
             mock_satellite = {"goes16": {"uv_index": day_data.get("uv_index", 7)}, "modis": {}, "firms": {}}
-            mock_elevation = {"elevation_m": 100, "altitude_effect": "none"}
             
             safety_data = risk_calculator.calculate_safety_score(
                 air_quality_data=mock_aq_data,
@@ -67,7 +106,7 @@ async def get_forecast(
                     "visibility": 10
                 },
                 satellite_data=mock_satellite,
-                elevation_data=mock_elevation,
+                elevation_data=elevation_data,
                 activity="hiking"  # Generic activity
             )
             
@@ -86,14 +125,20 @@ async def get_forecast(
             "location": {
                 "lat": lat,
                 "lon": lon,
-                "city": None,
-                "address": None
+                "city": place.get("city"),
+                "address": place.get("address")
             },
             "forecast": forecast_days,
             "generated_at": datetime.utcnow()
         }
         
         logger.info(f"[{request_id}] Forecast generated: {len(forecast_days)} days")
+        
+        try:
+            await cache.setex(cache_key, FORECAST_CACHE_TTL, orjson.dumps(response).decode())
+        except Exception as e:
+            logger.warning(f"[{request_id}] Forecast cache write failed: {e}")
+        
         return response
         
     except Exception as e:
@@ -101,17 +146,18 @@ async def get_forecast(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-def _predict_aqi(day_data: dict, historical: list[dict]) -> int:
+def _predict_aqi(day_data: dict, base_avg: float) -> int:
     """
     Predict AQI based on weather and historical data.
     
+    Args:
+        day_data: Daily weather forecast
+        base_avg: Historical average AQI (precomputed once per request)
+    
     TODO: Implement ML model or better heuristics
     """
     # Simple baseline: use historical average with weather adjustments
-    if historical:
-        avg_aqi = sum(h.get("aqi_avg", 50) for h in historical) / len(historical)
-    else:
-        avg_aqi = 50
+    avg_aqi = base_avg
     
     # Adjust based on weather
     precip_prob = day_data.get("precipitation_prob", 0)
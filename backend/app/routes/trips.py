@@ -1,54 +1,113 @@
 """Trips CRUD endpoints for saved trip data."""
 from fastapi import APIRouter, HTTPException, Request, Depends
 from app.models.schemas import TripCreate, TripResponse
-from app.database import get_db
-from supabase import Client
+from app.database import get_pool
+from app.cache import get_cache
 from typing import List, Optional
+import asyncpg
 import logging
+import orjson
+import uuid
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Single-trip cache (invalidated on delete)
+TRIP_CACHE_KEY = "trip:{trip_id}"
+TRIP_CACHE_TTL = 300
+
+# Trip list pages are cached per (user, version, limit, offset). Writes bump
+# the user's version tag, which orphans every cached page for that user
+LIST_CACHE_KEY = "trips:{user}:v{version}:{limit}:{offset}"
+LIST_VERSION_KEY = "trips:ver:{user}"
+LIST_CACHE_TTL = 60
+ALL_USERS = "*"
+
+# Columns returned to clients (table DDL: backend/sql/trips.sql)
+TRIP_COLUMNS = "id, user_id, activity, location_data, analysis_data, created_at, updated_at"
+
+
+def _row_to_trip(row: asyncpg.Record) -> dict:
+    """Convert a trips row to a TripResponse-compatible dict (UUIDs as strings)."""
+    trip = dict(row)
+    trip["id"] = str(trip["id"])
+    if trip["user_id"] is not None:
+        trip["user_id"] = str(trip["user_id"])
+    return trip
+
+
+def _normalize_user_id(user_id) -> Optional[str]:
+    """
+    Canonical string form of a user ID, used in list cache keys.
+    
+    Clients may send uppercase or unhyphenated UUIDs that Postgres accepts;
+    without normalizing, writes would bump a different version key than
+    the one the list pages were cached under.
+    """
+    if user_id is None:
+        return None
+    try:
+        return str(uuid.UUID(str(user_id)))
+    except ValueError:
+        raise HTTPException(status_code=422, detail="Invalid user_id")
+
+
+async def _list_version(cache, user: str) -> str:
+    """Current invalidation tag for a user's trip list."""
+    return await cache.get(LIST_VERSION_KEY.format(user=user)) or "0"
+
+
+async def _invalidate_trip_lists(user_id: Optional[str], request_id: str) -> None:
+    """
+    Invalidate cached list pages for a user and for the unfiltered list.
+    
+    Runs after the write has committed, so a cache outage is only logged:
+    failing the request would make clients retry an already-saved write.
+    Stale pages then age out within LIST_CACHE_TTL.
+    """
+    cache = get_cache()
+    users = {ALL_USERS, user_id} if user_id else {ALL_USERS}
+    for user in users:
+        try:
+            await cache.incr(LIST_VERSION_KEY.format(user=user))
+        except Exception as e:
+            logger.warning(f"[{request_id}] Trip list cache invalidation failed: {e}")
+
 
 @router.post("/trips", response_model=TripResponse, status_code=201)
 async def create_trip(
     request: Request,
     trip: TripCreate,
-    db: Client = Depends(get_db)
+    pool: asyncpg.Pool = Depends(get_pool)
 ):
     """
     Save a trip analysis.
     
-    Stores trip data in Supabase for later retrieval.
+    Stores trip data in Postgres for later retrieval.
     """
     request_id = getattr(request.state, "request_id", "unknown")
     logger.info(f"[{request_id}] Creating trip: {trip.activity}")
+    user_id = _normalize_user_id(trip.user_id)
     
     try:
-        # TODO: Implement actual database insert
-        # trip_data = {
-        #     "user_id": trip.user_id,
-        #     "activity": trip.activity,
-        #     "location_data": trip.location_data,
-        #     "analysis_data": trip.analysis_data
-        # }
-        # result = db.table("trips").insert(trip_data).execute()
-        
-        # Mock response for development
-        from datetime import datetime
-        mock_trip = {
-            "id": "trip_123456",
-            "user_id": trip.user_id,
-            "activity": trip.activity,
-            "location_data": trip.location_data,
-            "analysis_data": trip.analysis_data,
-            "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow()
-        }
-        
-        logger.info(f"[{request_id}] Trip created: {mock_trip['id']}")
-        return mock_trip
+        async with pool.acquire() as conn:
+            row = await conn.fetchrow(
+                f"""
+                INSERT INTO trips (user_id, activity, location_data, analysis_data)
+                VALUES ($1, $2, $3, $4)
+                RETURNING {TRIP_COLUMNS}
+                """,
+                user_id,
+                trip.activity,
+                trip.location_data,
+                trip.analysis_data
+            )
         
+        new_trip = _row_to_trip(row)
+        await _invalidate_trip_lists(user_id, request_id)
+        logger.info(f"[{request_id}] Trip created: {new_trip['id']}")
+        return new_trip
+    
     except Exception as e:
         logger.error(f"[{request_id}] Failed to create trip: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to save trip")
@@ -60,7 +119,7 @@ async def list_trips(
     user_id: Optional[str] = None,
     limit: int = 20,
     offset: int = 0,
-    db: Client = Depends(get_db)
+    pool: asyncpg.Pool = Depends(get_pool)
 ):
     """
     List saved trips.
@@ -72,72 +131,140 @@ async def list_trips(
     """
     request_id = getattr(request.state, "request_id", "unknown")
     logger.info(f"[{request_id}] Listing trips: user_id={user_id}")
+    user_id = _normalize_user_id(user_id or None)
+    
+    cache = get_cache()
+    user = user_id or ALL_USERS
     
+    # Cache problems fall through to Postgres
+    cache_key = None
     try:
-        # TODO: Implement actual database query
-        # query = db.table("trips").select("*")
-        # if user_id:
-        #     query = query.eq("user_id", user_id)
-        # result = query.order("created_at", desc=True).range(offset, offset + limit - 1).execute()
-        
-        # Mock response
-        mock_trips = []
-        
-        logger.info(f"[{request_id}] Found {len(mock_trips)} trips")
-        return mock_trips
+        cache_key = LIST_CACHE_KEY.format(
+            user=user,
+            version=await _list_version(cache, user),
+            limit=limit,
+            offset=offset
+        )
+        cached = await cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"[{request_id}] Trip list cache hit: {cache_key}")
+            return orjson.loads(cached)
+    except Exception as e:
+        logger.warning(f"[{request_id}] Trip list cache read failed: {e}")
+    
+    try:
+        async with pool.acquire() as conn:
+            if user_id:
+                rows = await conn.fetch(
+                    f"""
+                    SELECT {TRIP_COLUMNS} FROM trips WHERE user_id = $1
+                    ORDER BY created_at DESC LIMIT $2 OFFSET $3
+                    """,
+                    user_id, limit, offset
+                )
+            else:
+                rows = await conn.fetch(
+                    f"SELECT {TRIP_COLUMNS} FROM trips ORDER BY created_at DESC LIMIT $1 OFFSET $2",
+                    limit, offset
+                )
         
+        trips = [_row_to_trip(row) for row in rows]
+    
     except Exception as e:
         logger.error(f"[{request_id}] Failed to list trips: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to retrieve trips")
+    
+    if cache_key is not None:
+        try:
+            await cache.setex(cache_key, LIST_CACHE_TTL, orjson.dumps(trips).decode())
+        except Exception as e:
+            logger.warning(f"[{request_id}] Trip list cache write failed: {e}")
+    
+    logger.info(f"[{request_id}] Found {len(trips)} trips")
+    return trips
 
 
 @router.get("/trips/{trip_id}", response_model=TripResponse)
 async def get_trip(
     request: Request,
     trip_id: str,
-    db: Client = Depends(get_db)
+    pool: asyncpg.Pool = Depends(get_pool)
 ):
     """Get a specific trip by ID."""
     request_id = getattr(request.state, "request_id", "unknown")
     logger.info(f"[{request_id}] Fetching trip: {trip_id}")
     
+    cache = get_cache()
+    cache_key = TRIP_CACHE_KEY.format(trip_id=trip_id)
+    
+    # Cache problems fall through to Postgres
+    try:
+        cached = await cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"[{request_id}] Trip cache hit: {trip_id}")
+            return orjson.loads(cached)
+    except Exception as e:
+        logger.warning(f"[{request_id}] Trip cache read failed: {e}")
+    
     try:
-        # TODO: Implement actual database query
-        # result = db.table("trips").select("*").eq("id", trip_id).execute()
-        # if not result.data:
-        #     raise HTTPException(status_code=404, detail="Trip not found")
-        # return result.data[0]
+        async with pool.acquire() as conn:
+            row = await conn.fetchrow(f"SELECT {TRIP_COLUMNS} FROM trips WHERE id = $1", trip_id)
         
-        raise HTTPException(status_code=404, detail="Trip not found")
+        if row is None:
+            raise HTTPException(status_code=404, detail="Trip not found")
         
+        trip = _row_to_trip(row)
+    
     except HTTPException:
         raise
+    except asyncpg.DataError:
+        # Malformed trip ID (not a UUID)
+        raise HTTPException(status_code=404, detail="Trip not found")
     except Exception as e:
         logger.error(f"[{request_id}] Failed to get trip: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to retrieve trip")
+    
+    try:
+        await cache.setex(cache_key, TRIP_CACHE_TTL, orjson.dumps(trip).decode())
+    except Exception as e:
+        logger.warning(f"[{request_id}] Trip cache write failed: {e}")
+    return trip
 
 
 @router.delete("/trips/{trip_id}", status_code=204)
 async def delete_trip(
     request: Request,
     trip_id: str,
-    db: Client = Depends(get_db)
+    pool: asyncpg.Pool = Depends(get_pool)
 ):
     """Delete a trip."""
     request_id = getattr(request.state, "request_id", "unknown")
     logger.info(f"[{request_id}] Deleting trip: {trip_id}")
     
     try:
-        # TODO: Implement actual database delete
-        # result = db.table("trips").delete().eq("id", trip_id).execute()
-        # if not result.data:
-        #     raise HTTPException(status_code=404, detail="Trip not found")
+        async with pool.acquire() as conn:
+            row = await conn.fetchrow(
+                "DELETE FROM trips WHERE id = $1 RETURNING id, user_id",
+                trip_id
+            )
+        
+        if row is None:
+            raise HTTPException(status_code=404, detail="Trip not found")
+        
+        try:
+            await get_cache().delete(TRIP_CACHE_KEY.format(trip_id=trip_id))
+        except Exception as e:
+            # Already deleted in Postgres; the cached copy expires within TRIP_CACHE_TTL
+            logger.warning(f"[{request_id}] Trip cache invalidation failed: {e}")
+        await _invalidate_trip_lists(_normalize_user_id(row["user_id"]), request_id)
         
         logger.info(f"[{request_id}] Trip deleted: {trip_id}")
         return None
-        
+    
     except HTTPException:
         raise
+    except asyncpg.DataError:
+        raise HTTPException(status_code=404, detail="Trip not found")
     except Exception as e:
         logger.error(f"[{request_id}] Failed to delete trip: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to delete trip")
@@ -4,23 +4,247 @@ Google Earth Engine Air Quality Service - 100% Cirúrgico!
 Acessa dados de satélite TEMPO e Sentinel-5P sem downloads.
 Cobertura global com dados precisos e em tempo real.
 """
+import asyncio
 import logging
-from typing import Optional, Dict
-from datetime import datetime, timedelta
-import ee
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, NamedTuple, Optional, Tuple
+from datetime import date as dt_date, timedelta
+from functools import lru_cache
+import orjson
+from app.cache import LRUCache, coalesce, get_cache
 from app.config import settings
 
+# ee é importado sob demanda em initialize(): o import puxa google.auth,
+# httplib2 etc. e pesa no cold start de workers que nunca chegam a usá-lo.
+# Todo uso de ee.* acontece depois de uma inicialização bem-sucedida.
+if TYPE_CHECKING:
+    import ee
+
 logger = logging.getLogger(__name__)
 
+# Máximo de consultas simultâneas ao Earth Engine por processo. O cliente
+# EE mantém um pool HTTP pequeno; acima disso surgem "Connection pool is
+# full" e throttling (429) do servidor.
+MAX_CONCURRENT_EE_QUERIES = 5
+_ee_semaphore = asyncio.Semaphore(MAX_CONCURRENT_EE_QUERIES)
+
+# getInfo() é síncrono (HTTP bloqueante); roda em threads próprias para
+# não travar o event loop durante o round-trip ao Earth Engine.
+# Uma thread por vaga do semáforo: nunca há mais chamadas HTTP simultâneas
+# que o pool de conexões do cliente EE (urllib3, 10 por host) comporta, então
+# as conexões TLS são reaproveitadas em vez de descartadas e reabertas.
+_ee_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_EE_QUERIES, thread_name_prefix='ee')
+
+
+def shutdown_executor() -> None:
+    """Encerra as threads do Earth Engine (shutdown da aplicação)."""
+    _ee_executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Retry com backoff exponencial (0.5s, 1s, ...) para falhas transitórias
+# do Earth Engine: throttling, cota e erros internos do servidor
+EE_MAX_ATTEMPTS = 3
+EE_BACKOFF_BASE_S = 0.5
+_TRANSIENT_EE_ERRORS = ('rate limit', 'quota', '429', 'internal', 'too many')
+
+
+def _is_transient(error: Exception) -> bool:
+    """Verifica se o erro do Earth Engine vale uma nova tentativa."""
+    message = str(error).lower()
+    return any(marker in message for marker in _TRANSIENT_EE_ERRORS)
+
+
+async def _get_info(obj) -> Any:
+    """
+    Executa obj.getInfo() no executor do Earth Engine.
+    
+    Repete com backoff exponencial em erros transitórios; outros erros
+    (e a última tentativa) são propagados ao chamador.
+    """
+    loop = asyncio.get_running_loop()
+    for attempt in range(EE_MAX_ATTEMPTS):
+        try:
+            return await loop.run_in_executor(_ee_executor, obj.getInfo)
+        except ee.EEException as e:
+            if attempt == EE_MAX_ATTEMPTS - 1 or not _is_transient(e):
+                raise
+            delay = EE_BACKOFF_BASE_S * 2 ** attempt
+            logger.warning("⏳ Earth Engine transient error, retrying in %.1fs: %s", delay, e)
+            await asyncio.sleep(delay)
+
+
+# TEMPO coverage bounds (América do Norte)
+_TEMPO_LAT_MIN, _TEMPO_LAT_MAX = 15.0, 70.0
+_TEMPO_LON_MIN, _TEMPO_LON_MAX = -170.0, -40.0
+
+# Chave do resultado no cache compartilhado (app.cache)
+SHARED_CACHE_KEY = "ee:no2:{dataset}:{lat}:{lon}:{date}"
+
+# Espera (s) pelo TEMPO antes de disparar o Sentinel-5P em paralelo
+TEMPO_HEDGE_DELAY_S = 2.0
+
+# Raio de busca maior que o pedido pelo chamador: mais pixels válidos
+SEARCH_RADIUS_KM = 25.0
+
+# Erro máximo (m) aceito ao aproximar o círculo de busca por um polígono
+BUFFER_MAX_ERROR_M = 1000
+
+# Janela de busca padrão quando nenhuma data é informada (fim exclusivo).
+# A imagem mais recente dentro da janela é usada.
+DEFAULT_SEARCH_START = '2025-07-15'
+DEFAULT_SEARCH_END = '2025-09-26'
+
+# O mosaico só usa imagens até N dias antes da mais recente: pixels mais
+# antigos não podem ser apresentados com a data da imagem mais recente
+MOSAIC_WINDOW_DAYS = 3
+
+
+def _recent_mosaic(images: 'ee.ImageCollection', latest: 'ee.Image') -> 'ee.Image':
+    """Mosaico cronológico (mais recente por cima) limitado a MOSAIC_WINDOW_DAYS antes de latest."""
+    since = latest.date().advance(-MOSAIC_WINDOW_DAYS, 'day')
+    return (images.filter(ee.Filter.gte('system:time_start', since.millis()))
+            .sort('system:time_start')
+            .mosaic())
+
+
+def _date_range(date: Optional[str]) -> tuple[str, str]:
+    """Intervalo [início, fim) para filterDate: um dia específico ou a janela padrão."""
+    if date is None:
+        return DEFAULT_SEARCH_START, DEFAULT_SEARCH_END
+    # Earth Engine precisa de range (início e fim diferentes)
+    return date, _next_day(date)
+
+
+@lru_cache(maxsize=256)
+def _next_day(date: str) -> str:
+    """Dia seguinte a uma data YYYY-MM-DD (fromisoformat é bem mais rápido que strptime)."""
+    return (dt_date.fromisoformat(date) + timedelta(days=1)).isoformat()
+
+
+# Conversão coluna → ppb (aproximada), pré-calculada num único fator.
+# Assume altura troposférica ~3km = 300000 cm e densidade do ar ao nível
+# do mar ~2.5e19 molec/cm³: ppb = (coluna / altura_cm) / densidade_ar * 1e9
+_TROPOSPHERE_HEIGHT_CM = 300000.0
+_AIR_DENSITY_MOLEC_CM3 = 2.5e19
+_AVOGADRO = 6.022e23  # molec/mol
+
+# TEMPO: molec/cm²
+_TEMPO_COLUMN_TO_PPB = 1e9 / (_TROPOSPHERE_HEIGHT_CM * _AIR_DENSITY_MOLEC_CM3)
+# Sentinel-5P: mol/m² -> molec/m² (× Avogadro), mesma divisão em seguida.
+# Mantém a fórmula original (sem converter m² -> cm²)
+_S5P_COLUMN_TO_PPB = _AVOGADRO * _TEMPO_COLUMN_TO_PPB
+
+
+@lru_cache(maxsize=8)
+def _stat_keys(prefix: str) -> Tuple[str, str, str, str]:
+    """Chaves (mean, stdDev, min, max) do redutor combinado para um prefixo de banda."""
+    return (f'{prefix}mean', f'{prefix}stdDev', f'{prefix}min', f'{prefix}max')
+
+
+def _search_area(lat: float, lon: float):
+    """Círculo de busca (ponto + buffer) em torno da localização."""
+    # maxError de 1km: polígono mais grosseiro, irrelevante para pixels de 1-2km
+    return ee.Geometry.Point([lon, lat]).buffer(SEARCH_RADIUS_KM * 1000, BUFFER_MAX_ERROR_M)  # km → metros
+
+
+class NO2Dataset(NamedTuple):
+    """Produto de NO2 no Earth Engine e como interpretar seus valores."""
+    key: str  # prefixo das chaves de coalescência
+    label: str  # nome curto para logs
+    collection_id: str
+    band: str
+    scale_m: int  # nominalScale do produto (ver EarthEngineService)
+    cache: LRUCache
+    ppb_factor: float  # coluna (unidade nativa) × fator = ppb
+    source: str
+
+
+# Motivos de ausência de dado (NO2Result.reason)
+REASON_NOT_INITIALIZED = 'not_initialized'
+REASON_NO_IMAGES = 'no_images'
+REASON_NO_VALID_PIXELS = 'no_valid_pixels'
+REASON_EE_ERROR = 'ee_error'
+REASON_OUTSIDE_COVERAGE = 'outside_coverage'
+
+
+class NO2Result(NamedTuple):
+    """
+    Resultado de uma consulta de NO2: data quando há dado, reason quando não.
+    
+    Distingue "não há imagens/pixels" (vale tentar outro produto) de falhas
+    do Earth Engine (o fallback bateria na mesma indisponibilidade).
+    """
+    data: Optional[Dict] = None
+    reason: Optional[str] = None
+    
+    @property
+    def ok(self) -> bool:
+        return self.data is not None
+    
+    def __bool__(self) -> bool:
+        # NamedTuple com 2 campos é sempre truthy; "if result:" deve refletir o dado
+        return self.data is not None
+
 
 class EarthEngineService:
     """Google Earth Engine service para dados de qualidade do ar."""
     
     _initialized = False
+    _init_lock = asyncio.Lock()
+    
+    # Após uma falha de autenticação, espera antes de tentar de novo: sem
+    # isso cada requisição refaria o handshake (bloqueante) com o Google
+    INIT_RETRY_INTERVAL_S = 300
+    _init_failed_at: Optional[float] = None
+    
+    # Endpoint de alto volume: feito para muitas chamadas pequenas e paralelas
+    # (servidores), com limites de concorrência maiores que o padrão
+    HIGH_VOLUME_URL = 'https://earthengine-highvolume.googleapis.com'
+    
+    # Cache em dois níveis por (lat, lon arredondados, data): LRU em memória
+    # e o cache compartilhado (Redis, se configurado), que sobrevive a restarts
+    # e é visto por todos os workers. TEMPO atualiza a cada hora, Sentinel-5P
+    # diariamente. Só resultados válidos são guardados.
+    # Arredondamento de 0.01° (~1km): menor que um pixel do TEMPO (~2.2km) e
+    # desprezível frente ao buffer de 25km, então usuários vizinhos
+    # compartilham a mesma entrada
+    CACHE_PRECISION = 2
+    
+    # Escala das reduções = resolução nativa (nominalScale) de cada produto no
+    # Earth Engine: TEMPO L3 em grade de 0.02° (~2.2km), Sentinel-5P L3 em
+    # 0.01° (~1.1km). Escalas menores só reamostram os mesmos pixels.
+    # Um buffer de 25km tem poucos milhares de pixels; maxPixels apertado
+    # falha rápido se a geometria crescer por engano.
+    MAX_PIXELS = int(1e6)
     
-    # TEMPO coverage bounds (América do Norte)
-    TEMPO_LAT_MIN, TEMPO_LAT_MAX = 15.0, 70.0
-    TEMPO_LON_MIN, TEMPO_LON_MAX = -170.0, -40.0
+    TEMPO = NO2Dataset(
+        key='tempo',
+        label='TEMPO',
+        collection_id='NASA/TEMPO/NO2_L3_QA',  # filtrado por qualidade
+        band='vertical_column_troposphere',  # molec/cm²
+        scale_m=2200,
+        cache=LRUCache(maxsize=1024, ttl=3600),
+        ppb_factor=_TEMPO_COLUMN_TO_PPB,
+        source="NASA TEMPO (Google Earth Engine)"
+    )
+    SENTINEL5P = NO2Dataset(
+        key='s5p',
+        label='Sentinel-5P',
+        collection_id='COPERNICUS/S5P/NRTI/L3_NO2',
+        band='NO2_column_number_density',  # mol/m²
+        scale_m=1113,
+        cache=LRUCache(maxsize=1024, ttl=86400),
+        ppb_factor=_S5P_COLUMN_TO_PPB,
+        source="Sentinel-5P TROPOMI (Google Earth Engine)"
+    )
+    
+    # Consultas em andamento por chave, para coalescer requisições duplicadas
+    _inflight: Dict[tuple, asyncio.Task] = {}
+    
+    # Objetos ee reutilizados entre requisições (criados após initialize())
+    _collections: Dict[str, Any] = {}
+    _stats_reducer = None
     
     @classmethod
     def initialize(cls):
@@ -32,40 +256,106 @@ class EarthEngineService:
         if cls._initialized:
             return
         
+        global ee
         try:
+            import ee
+            
             if settings.google_service_account_email and settings.google_service_account_key:
                 # Produção: Service Account
                 credentials = ee.ServiceAccountCredentials(
                     email=settings.google_service_account_email,
                     key_data=settings.google_service_account_key
                 )
-                ee.Initialize(credentials)
+                ee.Initialize(credentials, opt_url=cls.HIGH_VOLUME_URL)
                 logger.info("✅ Earth Engine initialized with Service Account")
             elif settings.google_cloud_project_id:
                 # Desenvolvimento: OAuth (requer ee.Authenticate() manual primeiro)
-                ee.Initialize(project=settings.google_cloud_project_id)
-                logger.info(f"✅ Earth Engine initialized with project: {settings.google_cloud_project_id}")
+                ee.Initialize(
+                    project=settings.google_cloud_project_id,
+                    opt_url=cls.HIGH_VOLUME_URL
+                )
+                logger.info("✅ Earth Engine initialized with project: %s", settings.google_cloud_project_id)
             else:
                 logger.warning("⚠️ Earth Engine credentials not configured")
                 return
             
+            cls._collections = {
+                dataset.key: ee.ImageCollection(dataset.collection_id)
+                for dataset in (cls.TEMPO, cls.SENTINEL5P)
+            }
+            cls._stats_reducer = (ee.Reducer.mean()
+                                  .combine(ee.Reducer.stdDev(), '', True)
+                                  .combine(ee.Reducer.min(), '', True)
+                                  .combine(ee.Reducer.max(), '', True))
             cls._initialized = True
             
         except Exception as e:
-            logger.error(f"❌ Earth Engine initialization failed: {e}")
+            logger.error("❌ Earth Engine initialization failed: %s", e)
             cls._initialized = False
     
+    @classmethod
+    async def ensure_initialized(cls) -> bool:
+        """
+        initialize() fora do event loop.
+        
+        ee.Initialize faz I/O bloqueante (autenticação, descoberta da API);
+        roda no executor do Earth Engine, uma vez só mesmo com chamadas
+        simultâneas. Falhas são lembradas por INIT_RETRY_INTERVAL_S.
+        """
+        if cls._initialized:
+            return True
+        
+        async with cls._init_lock:
+            if cls._initialized:
+                return True
+            if (cls._init_failed_at is not None
+                    and time.monotonic() - cls._init_failed_at < cls.INIT_RETRY_INTERVAL_S):
+                return False
+            
+            await asyncio.get_running_loop().run_in_executor(_ee_executor, cls.initialize)
+            cls._init_failed_at = None if cls._initialized else time.monotonic()
+        return cls._initialized
+    
     @staticmethod
     def is_tempo_coverage(lat: float, lon: float) -> bool:
         """Verifica se localização está na cobertura do TEMPO."""
-        return (EarthEngineService.TEMPO_LAT_MIN <= lat <= EarthEngineService.TEMPO_LAT_MAX and
-                EarthEngineService.TEMPO_LON_MIN <= lon <= EarthEngineService.TEMPO_LON_MAX)
+        return (_TEMPO_LAT_MIN <= lat <= _TEMPO_LAT_MAX and
+                _TEMPO_LON_MIN <= lon <= _TEMPO_LON_MAX)
+    
+    @classmethod
+    def cache_stats(cls) -> Dict[str, dict]:
+        """Tamanho e taxa de acerto do cache em memória de cada produto."""
+        return {dataset.key: dataset.cache.stats() for dataset in (cls.TEMPO, cls.SENTINEL5P)}
+    
+    @staticmethod
+    async def _coalesce(key: tuple, fetch: Callable[[], Awaitable[NO2Result]]) -> NO2Result:
+        """
+        Junta requisições simultâneas idênticas numa única consulta.
+        
+        A primeira chamada cria a task; as demais aguardam a mesma task.
+        O shield evita que o timeout de um chamador cancele a consulta
+        dos outros. Cada consulta ocupa uma vaga do _ee_semaphore.
+        """
+        async def bounded_fetch() -> NO2Result:
+            async with _ee_semaphore:
+                return await fetch()
+        
+        return await coalesce(EarthEngineService._inflight, key, bounded_fetch)
     
     @staticmethod
-    async def get_tempo_no2(lat: float, lon: float, radius_km: float = 10.0, date: Optional[str] = None) -> Optional[Dict]:
+    def _cache_key(lat: float, lon: float, date: Optional[str]) -> tuple:
+        """Chave de cache: coordenadas arredondadas (~1km) + data."""
+        precision = EarthEngineService.CACHE_PRECISION
+        return (round(lat, precision), round(lon, precision), date or "latest")
+    
+    @staticmethod
+    async def get_tempo_no2(lat: float, lon: float, radius_km: float = 10.0, date: Optional[str] = None) -> NO2Result:
         """
         Busca dados de NO2 do TEMPO (América do Norte, hourly).
         
+        Fora da cobertura do TEMPO retorna reason=outside_coverage sem
+        consultar o Earth Engine.
+        
         Args:
             lat: Latitude
             lon: Longitude
@@ -73,124 +363,14 @@ class EarthEngineService:
             date: Data no formato YYYY-MM-DD (None = hoje)
         
         Returns:
-            Dict com dados de NO2 ou None se indisponível
+            NO2Result com os dados de NO2, ou com o motivo da indisponibilidade
         """
-        if not EarthEngineService._initialized:
-            EarthEngineService.initialize()
-        
-        if not EarthEngineService._initialized:
-            logger.warning("⚠️ Earth Engine not initialized")
-            return None
-        
-        # Verificar cobertura
         if not EarthEngineService.is_tempo_coverage(lat, lon):
-            logger.info(f"📍 Location ({lat:.4f}, {lon:.4f}) outside TEMPO coverage")
-            return None
-
-        try:
-            # Tentar múltiplas datas se nenhuma for especificada
-            # Usar datas recentes de 2025 (dados atuais!)
-            dates_to_try = [
-                '2025-09-25',  # Setembro 2025 (dados mais recentes)
-                '2025-09-20',
-                '2025-09-15',
-                '2025-09-10',
-                '2025-08-25',  # Agosto 2025
-                '2025-08-20',
-                '2025-08-15',
-                '2025-08-10',
-                '2025-07-25',  # Julho 2025
-                '2025-07-20',
-                '2025-07-15'
-            ] if date is None else [date]
-
-            # Aumentar raio de busca para 25km (mais pixels válidos)
-            search_radius_km = 25.0
-
-            # Criar geometria (ponto + buffer)
-            point = ee.Geometry.Point([lon, lat])
-            area = point.buffer(search_radius_km * 1000)  # km → metros
-
-            logger.info(f"🔍 Searching TEMPO with {search_radius_km}km radius, trying {len(dates_to_try)} dates")
-
-            # Tentar cada data até encontrar dados válidos
-            for test_date in dates_to_try:
-                # Earth Engine precisa de range (início e fim diferentes)
-                date_obj = datetime.strptime(test_date, '%Y-%m-%d')
-                end_date = (date_obj + timedelta(days=1)).strftime('%Y-%m-%d')
-
-                # Dataset TEMPO NO2 (filtrado por qualidade)
-                tempo = ee.ImageCollection('NASA/TEMPO/NO2_L3_QA')
-
-                # Filtrar por data e região (range de date até end_date)
-                images = tempo.filterDate(test_date, end_date).filterBounds(area)
-
-                # Verificar se há dados
-                count = images.size().getInfo()
-                if count == 0:
-                    logger.info(f"⚠️ No TEMPO images for {test_date}, trying next date...")
-                    continue
-
-                logger.info(f"✅ Found {count} TEMPO images for {test_date}")
-
-                # Pegar primeira imagem (mais recente do dia)
-                image = images.first()
-                no2_band = image.select('vertical_column_troposphere')
-
-                # Extrair estatísticas da região
-                stats = no2_band.reduceRegion(
-                    reducer=ee.Reducer.mean()
-                        .combine(ee.Reducer.stdDev(), '', True)
-                        .combine(ee.Reducer.min(), '', True)
-                        .combine(ee.Reducer.max(), '', True),
-                    geometry=area,
-                    scale=1000,  # 1km resolution
-                    maxPixels=1e9
-                ).getInfo()
-
-                mean_value = stats.get('vertical_column_troposphere_mean')
-
-                if mean_value is None:
-                    logger.warning(f"⚠️ No valid NO2 values for {test_date}, trying next date...")
-                    continue
-
-                # Sucesso! Encontrou dados válidos
-                logger.info(f"✅ Valid data found for {test_date}")
-                date = test_date  # Usar a data que funcionou
-                break
-
-            # Se não encontrou dados em nenhuma data
-            if mean_value is None:
-                logger.warning(f"⚠️ No valid TEMPO NO2 values in region after trying {len(dates_to_try)} dates")
-                return None
-            
-            # Converter molec/cm² para ppb (aproximado)
-            # Fator de conversão: assumindo altura troposférica ~3km = 300000 cm
-            # Densidade ar ao nível do mar: ~2.5e19 molec/cm³
-            # ppb = (molec/cm² / altura_cm) / densidade_ar * 1e9
-            altura_cm = 300000  # 3km em cm
-            densidade_ar = 2.5e19  # molec/cm³
-            no2_ppb = (mean_value / altura_cm) / densidade_ar * 1e9
-            
-            logger.info(f"✅ TEMPO NO2: {no2_ppb:.2f} ppb (mean={mean_value:.2e} molec/cm²)")
-            
-            return {
-                "no2_ppb": no2_ppb,
-                "no2_column": mean_value,  # molec/cm²
-                "std": stats.get('vertical_column_troposphere_stdDev'),
-                "min": stats.get('vertical_column_troposphere_min'),
-                "max": stats.get('vertical_column_troposphere_max'),
-                "source": "NASA TEMPO (Google Earth Engine)",
-                "date": date,
-                "location": {"lat": lat, "lon": lon, "radius_km": radius_km}
-            }
-            
-        except Exception as e:
-            logger.error(f"❌ TEMPO data fetch failed: {type(e).__name__}: {e}")
-            return None
+            return NO2Result(reason=REASON_OUTSIDE_COVERAGE)
+        return await EarthEngineService._fetch_no2(EarthEngineService.TEMPO, lat, lon, radius_km, date)
     
     @staticmethod
-    async def get_sentinel5p_no2(lat: float, lon: float, radius_km: float = 10.0, date: Optional[str] = None) -> Optional[Dict]:
+    async def get_sentinel5p_no2(lat: float, lon: float, radius_km: float = 10.0, date: Optional[str] = None) -> NO2Result:
         """
         Busca dados de NO2 do Sentinel-5P (Global, daily).
         
@@ -203,110 +383,141 @@ class EarthEngineService:
             date: Data no formato YYYY-MM-DD (None = hoje)
         
         Returns:
-            Dict com dados de NO2 ou None se indisponível
+            NO2Result com os dados de NO2, ou com o motivo da indisponibilidade
         """
-        if not EarthEngineService._initialized:
-            EarthEngineService.initialize()
-        
-        if not EarthEngineService._initialized:
+        return await EarthEngineService._fetch_no2(EarthEngineService.SENTINEL5P, lat, lon, radius_km, date)
+    
+    @staticmethod
+    def _shared_cache_key(dataset: NO2Dataset, cache_key: tuple) -> str:
+        lat, lon, date = cache_key
+        return SHARED_CACHE_KEY.format(dataset=dataset.key, lat=lat, lon=lon, date=date)
+    
+    @staticmethod
+    async def _shared_cache_get(dataset: NO2Dataset, cache_key: tuple) -> Optional[Dict]:
+        """Lê o cache compartilhado (Redis); falhas viram miss."""
+        try:
+            cached = await get_cache().get(EarthEngineService._shared_cache_key(dataset, cache_key))
+            return orjson.loads(cached) if cached is not None else None
+        except Exception as e:
+            logger.warning("⚠️ Shared cache read failed: %s", e)
             return None
-
+    
+    @staticmethod
+    async def _shared_cache_set(dataset: NO2Dataset, cache_key: tuple, result: Dict) -> None:
+        """Grava no cache compartilhado com o mesmo TTL do cache local."""
         try:
-            # Tentar múltiplas datas se nenhuma for especificada
-            # Usar datas recentes de 2025 (dados atuais!)
-            dates_to_try = [
-                '2025-09-25',  # Setembro 2025 (dados mais recentes)
-                '2025-09-20',
-                '2025-09-15',
-                '2025-09-10',
-                '2025-08-25',  # Agosto 2025
-                '2025-08-20',
-                '2025-08-15',
-                '2025-08-10',
-                '2025-07-25',  # Julho 2025
-                '2025-07-20',
-                '2025-07-15'
-            ] if date is None else [date]
-
-            # Aumentar raio de busca para 25km
-            search_radius_km = 25.0
-
-            # Criar geometria
-            point = ee.Geometry.Point([lon, lat])
-            area = point.buffer(search_radius_km * 1000)
-
-            logger.info(f"🔍 Searching Sentinel-5P with {search_radius_km}km radius, trying {len(dates_to_try)} dates")
-
-            # Tentar cada data até encontrar dados válidos
-            for test_date in dates_to_try:
-                # Earth Engine precisa de range (início e fim diferentes)
-                date_obj = datetime.strptime(test_date, '%Y-%m-%d')
-                end_date = (date_obj + timedelta(days=1)).strftime('%Y-%m-%d')
-
-                # Dataset Sentinel-5P NO2
-                s5p = ee.ImageCollection('COPERNICUS/S5P/NRTI/L3_NO2')
-
-                # Filtrar por data e região (range de date até end_date)
-                images = s5p.filterDate(test_date, end_date).filterBounds(area)
-
-                count = images.size().getInfo()
-                if count == 0:
-                    logger.info(f"⚠️ No Sentinel-5P images for {test_date}, trying next date...")
-                    continue
-
-                logger.info(f"✅ Found {count} Sentinel-5P images for {test_date}")
-
-                # Pegar primeira imagem
-                image = images.first()
-                no2_band = image.select('NO2_column_number_density')
-
-                # Extrair estatísticas
-                stats = no2_band.reduceRegion(
-                    reducer=ee.Reducer.mean(),
-                    geometry=area,
-                    scale=1000,
-                    maxPixels=1e9
-                ).getInfo()
-
-                mean_value = stats.get('NO2_column_number_density_mean')
-
-                if mean_value is None:
-                    logger.warning(f"⚠️ No valid NO2 values for {test_date}, trying next date...")
-                    continue
-
-                # Sucesso! Encontrou dados válidos
-                logger.info(f"✅ Valid Sentinel-5P data found for {test_date}")
-                date = test_date
-                break
-
-            # Se não encontrou dados em nenhuma data
-            if mean_value is None:
-                logger.warning(f"⚠️ No valid Sentinel-5P NO2 values after trying {len(dates_to_try)} dates")
-                return None
+            await get_cache().setex(
+                EarthEngineService._shared_cache_key(dataset, cache_key),
+                int(dataset.cache.ttl),
+                orjson.dumps(result).decode()
+            )
+        except Exception as e:
+            logger.warning("⚠️ Shared cache write failed: %s", e)
+    
+    @staticmethod
+    async def _fetch_no2(dataset: NO2Dataset, lat: float, lon: float, radius_km: float, date: Optional[str]) -> NO2Result:
+        """Inicialização, cache e coalescência comuns aos produtos de NO2."""
+        if not await EarthEngineService.ensure_initialized():
+            logger.warning("⚠️ Earth Engine not initialized")
+            return NO2Result(reason=REASON_NOT_INITIALIZED)
+        
+        cache_key = EarthEngineService._cache_key(lat, lon, date)
+        cached = dataset.cache.get(cache_key)
+        if cached is not None:
+            logger.info("⚡ %s cache hit for %s", dataset.label, cache_key)
+            return NO2Result(data=cached)
+        
+        cached = await EarthEngineService._shared_cache_get(dataset, cache_key)
+        if cached is not None:
+            logger.info("⚡ %s shared cache hit for %s", dataset.label, cache_key)
+            dataset.cache.set(cache_key, cached)
+            return NO2Result(data=cached)
+        
+        return await EarthEngineService._coalesce(
+            (dataset.key,) + cache_key,
+            lambda: EarthEngineService._query_no2(dataset, lat, lon, radius_km, date, cache_key)
+        )
+    
+    @staticmethod
+    async def _query_no2(dataset: NO2Dataset, lat: float, lon: float, radius_km: float, date: Optional[str], cache_key: tuple) -> NO2Result:
+        """Consulta o Earth Engine e guarda resultados válidos no cache."""
+        try:
+            start_date, end_date = _date_range(date)
             
-            # Converter mol/m² para ppb (aproximado)
-            # mol/m² -> molec/m² -> molec/cm³ -> ppb
-            # 1 mol = 6.022e23 molec
-            # altura troposférica ~3000m
-            # densidade ar ~2.5e19 molec/cm³
-            molec_m2 = mean_value * 6.022e23  # mol/m² -> molec/m²
-            molec_cm3 = molec_m2 / (3000 * 100)  # dividir por altura em cm
-            densidade_ar = 2.5e19  # molec/cm³
-            no2_ppb = (molec_cm3 / densidade_ar) * 1e9
+            area = _search_area(lat, lon)
             
-            logger.info(f"✅ Sentinel-5P NO2: {no2_ppb:.2f} ppb")
+            logger.info("🔍 Searching %s with %skm radius, %s → %s", dataset.label, SEARCH_RADIUS_KM, start_date, end_date)
             
-            return {
-                "no2_ppb": no2_ppb,
-                "no2_column": mean_value,  # mol/m²
-                "source": "Sentinel-5P TROPOMI (Google Earth Engine)",
-                "date": date,
-                "location": {"lat": lat, "lon": lon, "radius_km": radius_km}
-            }
+            # Uma única consulta no servidor para todo o intervalo de datas.
+            # filterBounds pela área de busca (não pelo ponto): cenas que
+            # cruzam o buffer sem cobrir o centro (bordas de faixa/varredura)
+            # também contribuem pixels para o reduceRegion
+            images = (EarthEngineService._collections[dataset.key]
+                      .filterDate(start_date, end_date)
+                      .filterBounds(area)
+                      .select(dataset.band))
+            
+            # Mosaico em ordem cronológica: a imagem mais recente fica por cima e
+            # pixels mascarados (nuvens, QA) são preenchidos pelas anteriores
+            # dos últimos MOSAIC_WINDOW_DAYS dias.
+            # Estatísticas + data da imagem mais recente num único getInfo().
+            # Sem imagens no intervalo, first() é nulo e o If devolve um dicionário
+            # vazio no servidor (dispensa o round-trip extra de size())
+            latest = ee.Image(images.sort('system:time_start', False).first())
+            mosaic = _recent_mosaic(images, latest)
+            query = ee.Algorithms.If(
+                latest,
+                mosaic.reduceRegion(
+                    reducer=EarthEngineService._stats_reducer,
+                    geometry=area,
+                    scale=dataset.scale_m,
+                    maxPixels=EarthEngineService.MAX_PIXELS,
+                    tileScale=4  # tiles menores: evita "User memory limit exceeded"
+                ).set('date', latest.date().format('YYYY-MM-dd')),
+                ee.Dictionary({})
+            )
+            stats = await _get_info(ee.Dictionary(query))
+            
+            result = EarthEngineService._build_result(dataset, stats, f'{dataset.band}_', lat, lon, radius_km)
+            if result is None:
+                if stats.get('date') is None:
+                    logger.warning("⚠️ No %s images between %s and %s", dataset.label, start_date, end_date)
+                    return NO2Result(reason=REASON_NO_IMAGES)
+                logger.warning("⚠️ No valid %s NO2 values in region for %s", dataset.label, stats['date'])
+                return NO2Result(reason=REASON_NO_VALID_PIXELS)
+            
+            logger.info("✅ %s NO2: %.2f ppb (mean=%.2e)", dataset.label, result['no2_ppb'], result['no2_column'])
+            dataset.cache.set(cache_key, result)
+            await EarthEngineService._shared_cache_set(dataset, cache_key, result)
+            return NO2Result(data=result)
             
         except Exception as e:
-            logger.error(f"❌ Sentinel-5P data fetch failed: {e}")
+            logger.error("❌ %s data fetch failed: %s: %s", dataset.label, type(e).__name__, e)
+            return NO2Result(reason=REASON_EE_ERROR)
+    
+    @staticmethod
+    def _build_result(dataset: NO2Dataset, stats: Dict, prefix: str, lat: float, lon: float, radius_km: float) -> Optional[Dict]:
+        """
+        Monta o dict de resultado a partir das estatísticas do redutor.
+        
+        prefix é o prefixo das chaves do reduceRegion ('<banda>_').
+        None se não houver média.
+        """
+        mean_key, std_key, min_key, max_key = _stat_keys(prefix)
+        mean_value = stats.get(mean_key)
+        if mean_value is None:
             return None
+        
+        return {
+            "no2_ppb": mean_value * dataset.ppb_factor,
+            "no2_column": mean_value,  # unidade nativa da banda
+            "std": stats.get(std_key),
+            "min": stats.get(min_key),
+            "max": stats.get(max_key),
+            "source": dataset.source,
+            "date": stats.get('date'),
+            "location": {"lat": lat, "lon": lon, "radius_km": radius_km}
+        }
 
 
 async def fetch_earth_engine_no2(lat: float, lon: float) -> Optional[Dict]:
@@ -326,13 +537,36 @@ async def fetch_earth_engine_no2(lat: float, lon: float) -> Optional[Dict]:
     """
     # Tentar TEMPO primeiro (se na América do Norte)
     if EarthEngineService.is_tempo_coverage(lat, lon):
-        logger.info(f"🛰️ Trying TEMPO for ({lat:.4f}, {lon:.4f})")
-        tempo_data = await EarthEngineService.get_tempo_no2(lat, lon)
-        if tempo_data:
-            return tempo_data
-        logger.info(f"⚠️ TEMPO unavailable, trying Sentinel-5P...")
+        logger.info("🛰️ Trying TEMPO for (%.4f, %.4f)", lat, lon)
+        tempo_task = asyncio.create_task(EarthEngineService.get_tempo_no2(lat, lon))
+        s5p_task: Optional[asyncio.Task] = None
+        try:
+            # Hedge: se o TEMPO demorar, dispara o Sentinel-5P em paralelo. A
+            # prioridade do TEMPO é mantida; só o pior caso (TEMPO lento e sem
+            # dado) deixa de somar as duas latências
+            done, _ = await asyncio.wait({tempo_task}, timeout=TEMPO_HEDGE_DELAY_S)
+            if not done:
+                logger.info("⏱️ TEMPO slow, starting Sentinel-5P in parallel")
+                s5p_task = asyncio.create_task(EarthEngineService.get_sentinel5p_no2(lat, lon))
+            
+            tempo = await tempo_task
+            if tempo.ok:
+                return tempo.data
+            # Sem dado TEMPO: Sentinel-5P pode ter. Falha do próprio Earth Engine:
+            # o fallback só dobraria a espera pela mesma indisponibilidade
+            if s5p_task is None and tempo.reason not in (REASON_NO_IMAGES, REASON_NO_VALID_PIXELS):
+                logger.warning("⚠️ TEMPO failed (%s), skipping Sentinel-5P", tempo.reason)
+                return None
+            logger.info("⚠️ TEMPO unavailable (%s), using Sentinel-5P...", tempo.reason)
+            if s5p_task is not None:
+                return (await s5p_task).data
+        finally:
+            # A consulta em si é compartilhada (_coalesce) e continua para
+            # preencher o cache; só a espera deste chamador é cancelada
+            for task in (tempo_task, s5p_task):
+                if task is not None and not task.done():
+                    task.cancel()
     
     # Fallback para Sentinel-5P (global)
-    logger.info(f"🛰️ Trying Sentinel-5P for ({lat:.4f}, {lon:.4f})")
-    return await EarthEngineService.get_sentinel5p_no2(lat, lon)
-
+    logger.info("🛰️ Trying Sentinel-5P for (%.4f, %.4f)", lat, lon)
+    return (await EarthEngineService.get_sentinel5p_no2(lat, lon)).data
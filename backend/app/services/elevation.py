@@ -1,20 +1,67 @@
 """Elevation and terrain data service."""
+import asyncio
+import bisect
 import httpx
 import logging
 from typing import Optional
 import math
+import orjson
+from app.cache import LRUCache, coalesce, get_cache
+from app.services.http import NON_RETRYABLE_STATUS, retry_delay, use_client
 
 logger = logging.getLogger(__name__)
 
+# Elevation never changes: cache by coordinates rounded to 3 decimals
+# (~100m grid, far finer than the terrain-score bands)
+ELEVATION_CACHE_PRECISION = 3
+_elevation_cache = LRUCache(maxsize=10_000)
 
-async def fetch_elevation(lat: float, lon: float) -> Optional[dict]:
+# Second tier shared by workers and kept across restarts (Redis when
+# configured). Entries are effectively permanent; the TTL only bounds size
+ELEVATION_SHARED_KEY = "elev:{lat}:{lon}"
+ELEVATION_SHARED_TTL = 30 * 86400
+
+# In-flight lookups by rounded coordinates (single-flight)
+_inflight: dict[tuple[float, float], asyncio.Task] = {}
+
+
+# Open-Elevation accepts many points per POST; keep batches modest
+OPEN_ELEVATION_URL = "https://api.open-elevation.com/api/v1/lookup"
+ELEVATION_BATCH_SIZE = 100
+
+
+# Elevation bands (m): label i covers [EDGES[i-1], EDGES[i])
+_TERRAIN_EDGES = (300, 1000, 2500)
+_TERRAIN_LABELS = ("lowland", "hills", "mountains", "high_mountains")
+_ALTITUDE_EDGES = (1500, 2500, 3500)
+_ALTITUDE_LABELS = ("none", "minimal", "moderate", "significant")
+
+
+def _build_elevation_result(elevation_m: float) -> dict:
+    """Shape a raw elevation into the fetch_elevation result dict."""
+    return {
+        "elevation_m": round(elevation_m, 1),
+        "slope_degrees": None,  # Would require multiple points to calculate
+        "terrain_type": _TERRAIN_LABELS[bisect.bisect_right(_TERRAIN_EDGES, elevation_m)]
+    }
+
+
+async def fetch_elevation(
+    lat: float,
+    lon: float,
+    client: Optional[httpx.AsyncClient] = None
+) -> Optional[dict]:
     """
     Get elevation and terrain data.
     API: Open-Elevation or Mapbox Tilequery
     
+    Successful lookups are cached by rounded coordinates, in-process and
+    in the shared app cache.
+    
     Args:
         lat: Latitude
         lon: Longitude
+        client: Shared AsyncClient (a temporary one is created if omitted)
     
     Returns:
         dict with keys:
@@ -23,103 +70,230 @@ async def fetch_elevation(lat: float, lon: float) -> Optional[dict]:
             - terrain_type: str
         Returns None on failure
     """
+    lat = round(lat, ELEVATION_CACHE_PRECISION)
+    lon = round(lon, ELEVATION_CACHE_PRECISION)
+    cached = _elevation_cache.get((lat, lon))
+    if cached is not None:
+        logger.debug("Elevation cache hit for (%s, %s)", lat, lon)
+        return cached
+    
+    return await coalesce(_inflight, (lat, lon), lambda: _fetch_elevation_cached(lat, lon, client))
+
+
+async def _shared_cache_get(lat: float, lon: float) -> Optional[dict]:
+    """Read the shared tier (filling the local one on a hit); failures are misses."""
+    try:
+        cached = await get_cache().get(ELEVATION_SHARED_KEY.format(lat=lat, lon=lon))
+    except Exception as e:
+        logger.warning("Elevation shared cache read failed: %s", e)
+        return None
+    if cached is None:
+        return None
+    result = orjson.loads(cached)
+    _elevation_cache.set((lat, lon), result)
+    return result
+
+
+async def _cache_result(lat: float, lon: float, result: dict) -> None:
+    """Store a fetched elevation in both cache tiers."""
+    _elevation_cache.set((lat, lon), result)
+    try:
+        await get_cache().setex(
+            ELEVATION_SHARED_KEY.format(lat=lat, lon=lon),
+            ELEVATION_SHARED_TTL,
+            orjson.dumps(result).decode()
+        )
+    except Exception as e:
+        logger.warning("Elevation shared cache write failed: %s", e)
+
+
+async def _fetch_elevation_cached(
+    lat: float,
+    lon: float,
+    client: Optional[httpx.AsyncClient] = None
+) -> Optional[dict]:
+    """Shared-cache lookup, then the APIs; fills both cache tiers."""
+    result = await _shared_cache_get(lat, lon)
+    if result is not None:
+        return result
+    
+    result = await _fetch_elevation_uncached(lat, lon, client)
+    if result is not None:
+        await _cache_result(lat, lon, result)
+    return result
+
+
+async def fetch_elevation_batch(
+    points: list[tuple[float, float]],
+    client: Optional[httpx.AsyncClient] = None
+) -> list[Optional[dict]]:
+    """
+    Get elevation for many points with as few requests as possible.
+    
+    Points in either cache tier are answered without a request; the rest
+    are POSTed to Open-Elevation in chunks of ELEVATION_BATCH_SIZE,
+    concurrently, and the results written back to both tiers.
+    
+    Args:
+        points: List of (lat, lon) tuples
+        client: Shared AsyncClient (a temporary one is created if omitted)
+    
+    Returns:
+        List aligned with points, same dicts as fetch_elevation
+        (None where a chunk failed or a point came back without elevation)
+    """
+    results: list[Optional[dict]] = [None] * len(points)
+    local_misses: list[tuple[int, float, float]] = []
+    
+    for i, (lat, lon) in enumerate(points):
+        lat = round(lat, ELEVATION_CACHE_PRECISION)
+        lon = round(lon, ELEVATION_CACHE_PRECISION)
+        results[i] = _elevation_cache.get((lat, lon))
+        if results[i] is None:
+            local_misses.append((i, lat, lon))
+    
+    # Shared tier next (another worker may already have these points)
+    shared = await asyncio.gather(*(_shared_cache_get(lat, lon) for _, lat, lon in local_misses))
+    missing: list[tuple[int, float, float]] = []
+    for (i, lat, lon), result in zip(local_misses, shared):
+        results[i] = result
+        if result is None:
+            missing.append((i, lat, lon))
+    
+    if not missing:
+        return results
+    
+    chunks = [
+        missing[start:start + ELEVATION_BATCH_SIZE]
+        for start in range(0, len(missing), ELEVATION_BATCH_SIZE)
+    ]
+    logger.info("Fetching elevation for %s points in %s batch(es)", len(missing), len(chunks))
+    
+    async with use_client(client, timeout=10.0) as http:
+        async def post_chunk(chunk: list[tuple[int, float, float]]) -> None:
+            try:
+                response = await http.post(
+                    OPEN_ELEVATION_URL,
+                    content=orjson.dumps({
+                        "locations": [{"latitude": lat, "longitude": lon} for _, lat, lon in chunk]
+                    }),
+                    headers={"Content-Type": "application/json"},
+                    timeout=10.0
+                )
+                response.raise_for_status()
+                elevations = orjson.loads(response.content).get("results", [])
+            except Exception as e:
+                logger.warning("Batch elevation request failed (%s points): %s", len(chunk), e)
+                return
+            
+            if len(elevations) != len(chunk):
+                logger.warning("Batch elevation returned %s results for %s points", len(elevations), len(chunk))
+            
+            # Points without a value stay None (and uncached) so the caller
+            # can retry them individually
+            fetched = []
+            for (i, lat, lon), item in zip(chunk, elevations):
+                elevation = item.get("elevation")
+                if elevation is None:
+                    continue
+                results[i] = _build_elevation_result(elevation)
+                fetched.append(_cache_result(lat, lon, results[i]))
+            await asyncio.gather(*fetched)
+        
+        await asyncio.gather(*(post_chunk(chunk) for chunk in chunks))
+    
+    return results
+
+
+async def _fetch_elevation_uncached(
+    lat: float,
+    lon: float,
+    client: Optional[httpx.AsyncClient] = None
+) -> Optional[dict]:
+    """Query Open-Elevation (with USGS fallback) without the local cache."""
     max_retries = 3
     timeout = 10.0
     
     # Try Open-Elevation first (free, no API key needed)
-    base_url = "https://api.open-elevation.com/api/v1/lookup"
+    base_url = OPEN_ELEVATION_URL
     
     for attempt in range(max_retries):
         try:
-            logger.info(f"Fetching elevation for ({lat}, {lon}) - Attempt {attempt + 1}/{max_retries}")
+            logger.info("Fetching elevation for (%s, %s) - Attempt %s/%s", lat, lon, attempt + 1, max_retries)
             
-            async with httpx.AsyncClient(timeout=timeout) as client:
-                response = await client.get(
+            async with use_client(client, timeout=timeout) as http:
+                response = await http.get(
                     base_url,
-                    params={"locations": f"{lat},{lon}"}
+                    params={"locations": f"{lat},{lon}"},
+                    timeout=timeout
                 )
                 response.raise_for_status()
-                data = response.json()
+                data = orjson.loads(response.content)
                 
                 results = data.get("results", [])
                 if not results:
                     logger.warning("No elevation data in response")
                     return None
                 
-                elevation_m = results[0].get("elevation", 0)
-                
-                # Determine terrain type based on elevation
-                if elevation_m < 300:
-                    terrain_type = "lowland"
-                elif elevation_m < 1000:
-                    terrain_type = "hills"
-                elif elevation_m < 2500:
-                    terrain_type = "mountains"
-                else:
-                    terrain_type = "high_mountains"
+                result = _build_elevation_result(results[0].get("elevation", 0))
                 
-                result = {
-                    "elevation_m": round(elevation_m, 1),
-                    "slope_degrees": None,  # Would require multiple points to calculate
-                    "terrain_type": terrain_type
-                }
-                
-                logger.info(f"Elevation: {result['elevation_m']}m ({result['terrain_type']})")
+                logger.info("Elevation: %sm (%s)", result['elevation_m'], result['terrain_type'])
                 return result
                 
         except httpx.TimeoutException:
-            logger.warning(f"Timeout fetching elevation (attempt {attempt + 1})")
+            logger.warning("Timeout fetching elevation (attempt %s)", attempt + 1)
             if attempt == max_retries - 1:
                 logger.error("All elevation fetch attempts timed out")
                 return None
+            await asyncio.sleep(retry_delay(attempt))
+        except httpx.HTTPStatusError as e:
+            # Rejected requests won't succeed on retry: go straight to USGS
+            if e.response.status_code in NON_RETRYABLE_STATUS:
+                logger.warning("Open-Elevation rejected request: %s", e)
+                return await _fetch_elevation_usgs(lat, lon, client)
+            logger.warning("HTTP error fetching elevation: %s (attempt %s)", e, attempt + 1)
+            if attempt == max_retries - 1:
+                return await _fetch_elevation_usgs(lat, lon, client)
+            await asyncio.sleep(retry_delay(attempt, e.response))
         except httpx.HTTPError as e:
-            logger.warning(f"HTTP error fetching elevation: {e} (attempt {attempt + 1})")
+            logger.warning("HTTP error fetching elevation: %s (attempt %s)", e, attempt + 1)
             # Try USGS as fallback on last attempt
             if attempt == max_retries - 1:
-                return await _fetch_elevation_usgs(lat, lon)
+                return await _fetch_elevation_usgs(lat, lon, client)
+            await asyncio.sleep(retry_delay(attempt))
         except Exception as e:
-            logger.error(f"Unexpected error fetching elevation: {e}")
+            logger.error("Unexpected error fetching elevation: %s", e)
             return None
     
     return None
 
 
-async def _fetch_elevation_usgs(lat: float, lon: float) -> Optional[dict]:
+async def _fetch_elevation_usgs(
+    lat: float,
+    lon: float,
+    client: Optional[httpx.AsyncClient] = None
+) -> Optional[dict]:
     """Fallback to USGS Elevation Point Query Service."""
     try:
         logger.info("Trying USGS elevation service as fallback")
         base_url = "https://epqs.nationalmap.gov/v1/json"
         
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(
+        async with use_client(client, timeout=10.0) as http:
+            response = await http.get(
                 base_url,
-                params={"x": lon, "y": lat, "units": "Meters"}
+                params={"x": lon, "y": lat, "units": "Meters"},
+                timeout=10.0
             )
             response.raise_for_status()
-            data = response.json()
-            
-            elevation_m = data.get("value", 0)
+            data = orjson.loads(response.content)
             
-            if elevation_m < 300:
-                terrain_type = "lowland"
-            elif elevation_m < 1000:
-                terrain_type = "hills"
-            elif elevation_m < 2500:
-                terrain_type = "mountains"
-            else:
-                terrain_type = "high_mountains"
+            result = _build_elevation_result(data.get("value", 0))
             
-            result = {
-                "elevation_m": round(elevation_m, 1),
-                "slope_degrees": None,
-                "terrain_type": terrain_type
-            }
-            
-            logger.info(f"USGS Elevation: {result['elevation_m']}m")
+            logger.info("USGS Elevation: %sm", result['elevation_m'])
             return result
             
     except Exception as e:
-        logger.error(f"USGS elevation fetch failed: {e}")
+        logger.error("USGS elevation fetch failed: %s", e)
         return None
 
 
@@ -132,6 +306,12 @@ class ElevationService:
     # Alternative: USGS Elevation Point Query Service
     USGS_URL = "https://epqs.nationalmap.gov/v1/json"
     
+    # Max in-flight lookups per terrain profile (be polite to Open-Elevation)
+    PROFILE_CONCURRENCY = 10
+    
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
+        self.client = client  # shared app client; None = per-call client
+    
     async def get_elevation(
         self,
         lat: float,
@@ -148,11 +328,15 @@ class ElevationService:
             dict: Elevation data including altitude, terrain info
         """
         # Use the new fetch function
-        data = await fetch_elevation(lat, lon)
+        data = await fetch_elevation(lat, lon, client=self.client)
         
         if not data:
             return self._get_fallback_elevation()
         
+        return self._format_elevation(data)
+    
+    def _format_elevation(self, data: dict) -> dict:
+        """Add derived fields to a fetch_elevation result."""
         elevation_m = data["elevation_m"]
         elevation_ft = elevation_m * 3.28084
         
@@ -178,21 +362,40 @@ class ElevationService:
         Returns:
             list[dict]: Elevation profile data points
         """
-        logger.info(f"Fetching terrain profile for {len(waypoints)} waypoints")
+        logger.info("Fetching terrain profile for %s waypoints", len(waypoints))
         
-        # TODO: Implement batch elevation query for route
-        profile = []
+        # One batched request per chunk of waypoints
+        batch = await fetch_elevation_batch(waypoints, client=self.client)
+        results: list = [
+            self._format_elevation(data) if data else None
+            for data in batch
+        ]
         
-        for i, (lat, lon) in enumerate(waypoints):
-            elevation_data = await self.get_elevation(lat, lon)
-            profile.append({
-                "point": i,
-                "lat": lat,
-                "lon": lon,
-                **elevation_data
-            })
+        # Waypoints whose chunk failed fall back to single-point lookups
+        # (with retries and USGS), run concurrently but capped
+        failed = [i for i, data in enumerate(results) if data is None]
+        if failed:
+            semaphore = asyncio.Semaphore(self.PROFILE_CONCURRENCY)
+            
+            async def lookup(lat: float, lon: float) -> dict:
+                async with semaphore:
+                    return await self.get_elevation(lat, lon)
+            
+            retried = await asyncio.gather(
+                *(lookup(*waypoints[i]) for i in failed),
+                return_exceptions=True
+            )
+            for i, data in zip(failed, retried):
+                if isinstance(data, Exception):
+                    logger.warning("Elevation lookup failed for waypoint %s: %s", i, data)
+                    data = self._get_fallback_elevation()
+                results[i] = data
         
-        return profile
+        # Every slot is filled now; assemble the profile in one pass
+        return [
+            {"point": i, "lat": lat, "lon": lon, **data}
+            for i, ((lat, lon), data) in enumerate(zip(waypoints, results))
+        ]
     
     def _calculate_altitude_effect(self, elevation_m: float) -> str:
         """
@@ -204,14 +407,7 @@ class ElevationService:
         Returns:
             str: Altitude effect category
         """
-        if elevation_m < 1500:
-            return "none"
-        elif elevation_m < 2500:
-            return "minimal"
-        elif elevation_m < 3500:
-            return "moderate"
-        else:
-            return "significant"
+        return _ALTITUDE_LABELS[bisect.bisect_right(_ALTITUDE_EDGES, elevation_m)]
     
     def _get_fallback_elevation(self) -> dict:
         """Return fallback elevation data."""
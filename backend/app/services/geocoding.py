@@ -1,8 +1,12 @@
 """Geocoding service using Mapbox."""
+import asyncio
 import httpx
 import logging
-from typing import Optional
+import orjson
+from typing import Any, Awaitable, Callable, Optional
+from app.cache import LRUCache, coalesce, get_cache
 from app.config import settings
+from app.services.http import use_client
 
 logger = logging.getLogger(__name__)
 
@@ -12,8 +16,30 @@ class GeocodingService:
     
     BASE_URL = "https://api.mapbox.com/geocoding/v5/mapbox.places"
     
-    def __init__(self):
+    # Places don't move: cache successful lookups for a day. Reverse lookups
+    # are keyed by coordinates rounded to 5 decimals (~1m)
+    CACHE_TTL = 86400
+    REVERSE_PRECISION = 5
+    _geocode_cache = LRUCache(maxsize=1024, ttl=CACHE_TTL)
+    _reverse_cache = LRUCache(maxsize=1024, ttl=CACHE_TTL)
+    
+    # Second tier in the shared app cache (Redis when configured), so other
+    # workers and restarted processes reuse lookups instead of paying Mapbox
+    SHARED_KEY = "geo:{kind}:{key}"
+    
+    # In-flight lookups by cache key, shared by concurrent identical calls
+    _inflight: dict[tuple, asyncio.Task] = {}
+    
+    # Mapbox context entries we keep, by ID prefix
+    _CONTEXT_KINDS = frozenset(("place", "region", "country", "postcode"))
+    
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
         self.token = settings.mapbox_token
+        self.client = client  # shared app client; None = per-call client
+        
+        # Static query params, built once per service instead of per call
+        self._forward_params = {"access_token": self.token, "types": "place,address,poi"}
+        self._reverse_params = {"access_token": self.token, "types": "place,address"}
     
     async def geocode(
         self,
@@ -30,21 +56,34 @@ class GeocodingService:
         Returns:
             list[dict]: List of matching locations with coordinates
         """
-        logger.info(f"Geocoding query: '{query}'")
+        cache_key = (query.lower().strip(), limit)
+        cached = self._geocode_cache.get(cache_key)
+        if cached is not None:
+            logger.info("Geocoding cache hit: '%s'", query)
+            return cached
+        
+        return await coalesce(
+            self._inflight,
+            ("geocode",) + cache_key,
+            lambda: self._via_shared_cache(
+                "geocode", self._geocode_cache, cache_key,
+                lambda: self._geocode_uncached(query, limit, cache_key)
+            )
+        )
+    
+    async def _geocode_uncached(self, query: str, limit: int, cache_key: tuple) -> list[dict]:
+        """Query Mapbox forward geocoding and cache successful results."""
+        logger.info("Geocoding query: '%s'", query)
         
         try:
-            async with httpx.AsyncClient(timeout=settings.http_timeout) as client:
+            async with use_client(self.client, settings.http_timeout) as client:
                 # URL encode the query
                 response = await client.get(
                     f"{self.BASE_URL}/{query}.json",
-                    params={
-                        "access_token": self.token,
-                        "limit": limit,
-                        "types": "place,address,poi"
-                    }
+                    params={**self._forward_params, "limit": limit}
                 )
                 response.raise_for_status()
-                data = response.json()
+                data = orjson.loads(response.content)
                 
                 # TODO: Transform Mapbox response to simplified format
                 results = []
@@ -59,14 +98,15 @@ class GeocodingService:
                         "context": self._parse_context(feature.get("context", []))
                     })
                 
-                logger.info(f"Found {len(results)} results for '{query}'")
+                logger.info("Found %s results for '%s'", len(results), query)
+                await self._store("geocode", self._geocode_cache, cache_key, results)
                 return results
                 
         except httpx.HTTPError as e:
-            logger.error(f"HTTP error during geocoding: {e}")
+            logger.error("HTTP error during geocoding: %s", e)
             return []
         except Exception as e:
-            logger.error(f"Unexpected error during geocoding: {e}")
+            logger.error("Unexpected error during geocoding: %s", e)
             return []
     
     async def reverse_geocode(
@@ -84,19 +124,33 @@ class GeocodingService:
         Returns:
             dict: Location information (address, city, country, etc.)
         """
-        logger.info(f"Reverse geocoding ({lat}, {lon})")
+        cache_key = (round(lat, self.REVERSE_PRECISION), round(lon, self.REVERSE_PRECISION))
+        cached = self._reverse_cache.get(cache_key)
+        if cached is not None:
+            logger.info("Reverse geocoding cache hit (%s, %s)", lat, lon)
+            return cached
+        
+        return await coalesce(
+            self._inflight,
+            ("reverse",) + cache_key,
+            lambda: self._via_shared_cache(
+                "reverse", self._reverse_cache, cache_key,
+                lambda: self._reverse_geocode_uncached(lat, lon, cache_key)
+            )
+        )
+    
+    async def _reverse_geocode_uncached(self, lat: float, lon: float, cache_key: tuple) -> Optional[dict]:
+        """Query Mapbox reverse geocoding and cache successful results."""
+        logger.info("Reverse geocoding (%s, %s)", lat, lon)
         
         try:
-            async with httpx.AsyncClient(timeout=settings.http_timeout) as client:
+            async with use_client(self.client, settings.http_timeout) as client:
                 response = await client.get(
                     f"{self.BASE_URL}/{lon},{lat}.json",
-                    params={
-                        "access_token": self.token,
-                        "types": "place,address"
-                    }
+                    params=self._reverse_params
                 )
                 response.raise_for_status()
-                data = response.json()
+                data = orjson.loads(response.content)
                 
                 features = data.get("features", [])
                 if not features:
@@ -116,16 +170,56 @@ class GeocodingService:
                     "lon": lon
                 }
                 
-                logger.info(f"Reverse geocoded to: {result['city']}, {result['region']}")
+                logger.info("Reverse geocoded to: %s, %s", result['city'], result['region'])
+                await self._store("reverse", self._reverse_cache, cache_key, result)
                 return result
                 
         except httpx.HTTPError as e:
-            logger.error(f"HTTP error during reverse geocoding: {e}")
+            logger.error("HTTP error during reverse geocoding: %s", e)
             return None
         except Exception as e:
-            logger.error(f"Unexpected error during reverse geocoding: {e}")
+            logger.error("Unexpected error during reverse geocoding: %s", e)
             return None
     
+    def _shared_key(self, kind: str, cache_key: tuple) -> str:
+        return self.SHARED_KEY.format(kind=kind, key=":".join(map(str, cache_key)))
+    
+    async def _via_shared_cache(
+        self,
+        kind: str,
+        cache: LRUCache,
+        cache_key: tuple,
+        fetch: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Shared-cache lookup, then Mapbox (which fills both tiers)."""
+        try:
+            cached = await get_cache().get(self._shared_key(kind, cache_key))
+            if cached is not None:
+                result = orjson.loads(cached)
+                cache.set(cache_key, result)
+                return result
+        except Exception as e:
+            logger.warning("Geocoding shared cache read failed: %s", e)
+        return await fetch()
+    
+    async def _store(self, kind: str, cache: LRUCache, cache_key: tuple, result: Any) -> None:
+        """Cache a successful lookup in-process and in the shared cache."""
+        cache.set(cache_key, result)
+        try:
+            await get_cache().setex(
+                self._shared_key(kind, cache_key),
+                self.CACHE_TTL,
+                orjson.dumps(result).decode()
+            )
+        except Exception as e:
+            logger.warning("Geocoding shared cache write failed: %s", e)
+    
+    @classmethod
+    def clear_cache(cls) -> None:
+        """Drop all in-process geocoding results (e.g. between tests)."""
+        cls._geocode_cache.clear()
+        cls._reverse_cache.clear()
+    
     def _parse_context(self, context: list[dict]) -> dict:
         """
         Parse Mapbox context array into structured data.
@@ -139,16 +233,9 @@ class GeocodingService:
         parsed = {}
         
         for item in context:
-            item_id = item.get("id", "")
-            text = item.get("text")
-            
-            if item_id.startswith("place"):
-                parsed["place"] = text
-            elif item_id.startswith("region"):
-                parsed["region"] = text
-            elif item_id.startswith("country"):
-                parsed["country"] = text
-            elif item_id.startswith("postcode"):
-                parsed["postcode"] = text
+            # Context IDs look like "place.123", "region.456"
+            kind = item.get("id", "").split(".", 1)[0]
+            if kind in self._CONTEXT_KINDS:
+                parsed[kind] = item.get("text")
         
         return parsed
@@ -0,0 +1,82 @@
+"""Shared HTTP client for outbound API calls."""
+import httpx
+import random
+import socket
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+# Pool sizing for the app-lifetime client (see app.main lifespan)
+MAX_CONNECTIONS = 100
+MAX_KEEPALIVE_CONNECTIONS = 50
+# Drop idle connections before upstream servers do (typically 15-60 s)
+KEEPALIVE_EXPIRY = 15.0
+DEFAULT_TIMEOUT = httpx.Timeout(8.0, connect=3.0)
+
+# Disable Nagle so small JSON requests aren't held back waiting on delayed
+# ACKs, and let the kernel detect dead pooled connections
+SOCKET_OPTIONS = [
+    (socket.IPPROTO_TCP, socket.TCP_NODELAY, 1),
+    (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+]
+
+# Retry policy shared by the fetch_* retry loops
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 8.0
+NON_RETRYABLE_STATUS = frozenset((400, 401, 403, 404))
+
+
+def retry_delay(attempt: int, response: Optional[httpx.Response] = None) -> float:
+    """
+    Seconds to wait before retry number attempt + 1.
+    
+    Honors a numeric Retry-After on 429/503 responses, otherwise uses
+    exponential backoff with jitter so retries from concurrent requests
+    don't hit the upstream in lockstep. Capped at RETRY_MAX_DELAY.
+    """
+    if response is not None and response.status_code in (429, 503):
+        retry_after = response.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            return min(float(retry_after), RETRY_MAX_DELAY)
+    return min(RETRY_BASE_DELAY * 2 ** attempt + random.random() * 0.25, RETRY_MAX_DELAY)
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """
+    Create the shared AsyncClient used by all fetch_* services.
+    
+    HTTP/2 lets concurrent requests to the same host share one
+    TCP/TLS connection, and keep-alive avoids a handshake per call.
+    Retries are left to the services, which know what is safe to retry.
+    """
+    transport = httpx.AsyncHTTPTransport(
+        http2=True,
+        retries=0,
+        limits=httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_EXPIRY
+        ),
+        socket_options=SOCKET_OPTIONS
+    )
+    return httpx.AsyncClient(transport=transport, timeout=DEFAULT_TIMEOUT)
+
+
+@asynccontextmanager
+async def use_client(
+    client: Optional[httpx.AsyncClient],
+    timeout: float
+) -> AsyncIterator[httpx.AsyncClient]:
+    """
+    Yield the injected client, or a short-lived one if none was passed.
+    
+    Lets services be called from scripts and legacy classes that have
+    no access to app.state without duplicating the fallback logic.
+    """
+    if client is not None:
+        yield client
+        return
+    
+    # HTTP/2 so concurrent requests on the fallback client (e.g. batched
+    # elevation chunks) still share one connection
+    async with httpx.AsyncClient(http2=True, timeout=timeout) as own_client:
+        yield own_client
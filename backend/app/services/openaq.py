@@ -1,15 +1,33 @@
 """OpenAQ air quality data service."""
 import httpx
 import logging
+import orjson
 import asyncio
+import bisect
 from typing import Optional
 from datetime import datetime
 from app.config import settings
+from app.services.http import NON_RETRYABLE_STATUS, retry_delay, use_client
 
 logger = logging.getLogger(__name__)
 
+# Nearest stations queried per lookup (one /latest request each)
+MAX_LOCATIONS = 5
 
-async def fetch_openaq_data(lat: float, lon: float, radius_km: int = 25) -> Optional[dict]:
+# Attempts for the step-1 locations search (the per-location calls are not
+# retried: a missing station only drops out of the average)
+LOCATIONS_MAX_ATTEMPTS = 2
+
+# Sensor parameters we aggregate (hashed membership test per sensor)
+TRACKED_PARAMETERS = frozenset(("pm25", "no2"))
+
+
+async def fetch_openaq_data(
+    lat: float,
+    lon: float,
+    radius_km: int = 25,
+    client: Optional[httpx.AsyncClient] = None
+) -> Optional[dict]:
     """
     Fetch PM2.5 and NO2 from OpenAQ v3 API.
     
@@ -23,6 +41,7 @@ async def fetch_openaq_data(lat: float, lon: float, radius_km: int = 25) -> Opti
         lat: Latitude
         lon: Longitude
         radius_km: Search radius in kilometers
+        client: Shared AsyncClient (a temporary one is created if omitted)
     
     Returns:
         dict with keys:
@@ -41,24 +60,35 @@ async def fetch_openaq_data(lat: float, lon: float, radius_km: int = 25) -> Opti
     params = {
         "coordinates": f"{lat},{lon}",
         "radius": radius_km * 1000,  # Convert km to meters
-        "limit": 10,
+        "limit": MAX_LOCATIONS,  # only the nearest MAX_LOCATIONS are queried in step 2
         "sort": "distance"
     }
     
-    async with httpx.AsyncClient(timeout=15.0) as client:
+    async with use_client(client, timeout=15.0) as client:
         try:
-            logger.info(f"🔍 OpenAQ v3 Step 1: Finding locations near ({lat}, {lon})")
+            logger.info("🔍 OpenAQ v3 Step 1: Finding locations near (%s, %s)", lat, lon)
             
             # STEP 1: Get locations and build sensor ID → parameter name map
-            locations_response = await client.get(base_url, headers=headers, params=params)
-            locations_response.raise_for_status()
-            locations_data = locations_response.json()
+            # Retried once on timeouts, 429 (honoring Retry-After) and 5xx
+            for attempt in range(LOCATIONS_MAX_ATTEMPTS):
+                try:
+                    locations_response = await client.get(base_url, headers=headers, params=params, timeout=15.0)
+                    locations_response.raise_for_status()
+                    break
+                except (httpx.TimeoutException, httpx.HTTPStatusError) as e:
+                    response = getattr(e, "response", None)
+                    if (attempt == LOCATIONS_MAX_ATTEMPTS - 1
+                            or (response is not None and response.status_code in NON_RETRYABLE_STATUS)):
+                        raise
+                    logger.warning("⚠️ OpenAQ locations request failed (%s), retrying", e)
+                    await asyncio.sleep(retry_delay(attempt, response))
+            locations_data = orjson.loads(locations_response.content)
             
             locations = locations_data.get("results", [])
-            logger.info(f"✅ Found {len(locations)} locations within {radius_km}km")
+            logger.info("✅ Found %s locations within %skm", len(locations), radius_km)
             
             if not locations:
-                logger.warning(f"⚠️ No OpenAQ stations found within {radius_km}km")
+                logger.warning("⚠️ No OpenAQ stations found within %skm", radius_km)
                 return None
             
             # Build sensor map: sensor_id → parameter_name
@@ -75,73 +105,85 @@ async def fetch_openaq_data(lat: float, lon: float, radius_km: int = 25) -> Opti
                     param_name = param.get("name", "")
                     
                     # Map sensor ID to parameter name
-                    if param_name in ["pm25", "no2"]:
+                    if param_name in TRACKED_PARAMETERS:
                         sensor_map[sensor_id] = param_name
             
-            logger.info(f"📊 Built sensor map with {len(sensor_map)} relevant sensors (PM2.5/NO2)")
-            
-            # STEP 2: Fetch latest measurements using sensor map
-            pm25_values = []
-            no2_values = []
-            latest_timestamp = None
-            successful_fetches = 0
+            logger.info("📊 Built sensor map with %s relevant sensors (PM2.5/NO2)", len(sensor_map))
             
-            logger.info(f"🔍 OpenAQ v3 Step 2: Fetching measurements from {len(location_ids[:5])} locations")
+            # STEP 2: Fetch latest measurements from all locations concurrently
+            # (capped at MAX_LOCATIONS in step 1 to avoid rate limits)
+            logger.info("🔍 OpenAQ v3 Step 2: Fetching measurements from %s locations", len(location_ids))
             
-            # Limit to top 5 locations to avoid rate limits
-            for location_id in location_ids[:5]:
+            async def fetch_latest(location_id) -> Optional[list]:
                 try:
                     latest_url = f"{base_url}/{location_id}/latest"
                     
-                    logger.info(f"📡 Fetching latest from location {location_id}...")
+                    logger.info("📡 Fetching latest from location %s...", location_id)
                     latest_response = await client.get(latest_url, headers=headers, timeout=5.0)
                     latest_response.raise_for_status()
-                    latest_data = latest_response.json()
-                    
-                    # Parse results array
-                    # Structure: {"results": [{"sensorsId": 673, "value": 11.2, "datetime": {...}}, ...]}
-                    for result in latest_data.get("results", []):
-                        sensor_id = result.get("sensorsId")
-                        value = result.get("value")
-                        datetime_obj = result.get("datetime", {})
-                        timestamp = datetime_obj.get("utc") if isinstance(datetime_obj, dict) else None
-                        
-                        # Use sensor map to determine parameter type
-                        if sensor_id in sensor_map and value is not None:
-                            param_name = sensor_map[sensor_id]
-                            
-                            logger.info(f"✅ Location {location_id}, Sensor {sensor_id}: {param_name} = {value}")
-                            
-                            if param_name == "pm25":
-                                pm25_values.append(float(value))
-                            elif param_name == "no2":
-                                # NO2 values < 1 are likely in ppm, convert to µg/m³
-                                # NO2: 1 ppm ≈ 1880 µg/m³ at 25°C
-                                if value < 1:
-                                    value_ugm3 = float(value) * 1880
-                                    no2_values.append(value_ugm3)
-                                    logger.info(f"   ⚙️ Converted NO2 from {value} ppm to {value_ugm3:.2f} µg/m³")
-                                else:
-                                    no2_values.append(float(value))
-                            
-                            if timestamp and (not latest_timestamp or timestamp > latest_timestamp):
-                                latest_timestamp = timestamp
-                    
-                    successful_fetches += 1
+                    return orjson.loads(latest_response.content).get("results", [])
                     
                 except httpx.HTTPStatusError as e:
-                    logger.warning(f"⚠️ Location {location_id} failed: HTTP {e.response.status_code}")
-                    continue
+                    logger.warning("⚠️ Location %s failed: HTTP %s", location_id, e.response.status_code)
                 except Exception as e:
-                    logger.warning(f"⚠️ Location {location_id} error: {e}")
+                    logger.warning("⚠️ Location %s error: %s", location_id, e)
+                return None
+            
+            latest_results = await asyncio.gather(*(fetch_latest(location_id) for location_id in location_ids))
+            
+            # Running (sum, count) per pollutant: one pass, no value lists
+            pm25_sum = 0.0
+            pm25_n = 0
+            no2_sum = 0.0
+            no2_n = 0
+            latest_timestamp = ""  # ISO strings compare chronologically
+            successful_fetches = 0
+            
+            for location_id, results in zip(location_ids, latest_results):
+                if results is None:
                     continue
+                
+                # Parse results array
+                # Structure: {"results": [{"sensorsId": 673, "value": 11.2, "datetime": {...}}, ...]}
+                for result in results:
+                    value = result.get("value")
+                    if value is None:
+                        continue
+                    
+                    # Use sensor map to determine parameter type
+                    sensor_id = result.get("sensorsId")
+                    param_name = sensor_map.get(sensor_id)
+                    if param_name is None:
+                        continue
+                    
+                    logger.info("✅ Location %s, Sensor %s: %s = %s", location_id, sensor_id, param_name, value)
+                    
+                    value = float(value)
+                    if param_name == "pm25":
+                        pm25_sum += value
+                        pm25_n += 1
+                    else:
+                        # NO2 values < 1 are likely in ppm, convert to µg/m³
+                        # NO2: 1 ppm ≈ 1880 µg/m³ at 25°C
+                        if value < 1:
+                            logger.info("   ⚙️ Converted NO2 from %s ppm to %.2f µg/m³", value, value * 1880)
+                            value *= 1880
+                        no2_sum += value
+                        no2_n += 1
+                    
+                    datetime_obj = result.get("datetime")
+                    if isinstance(datetime_obj, dict):
+                        timestamp = datetime_obj.get("utc")
+                        if timestamp and timestamp > latest_timestamp:
+                            latest_timestamp = timestamp
+                
+                successful_fetches += 1
             
-            logger.info(f"📊 Collected {len(pm25_values)} PM2.5 values: {pm25_values[:5]}...")
-            logger.info(f"📊 Collected {len(no2_values)} NO2 values: {no2_values[:5]}...")
+            logger.info("📊 Collected %s PM2.5 and %s NO2 values", pm25_n, no2_n)
             
             # Calculate averages
-            pm25_avg = round(sum(pm25_values) / len(pm25_values), 2) if pm25_values else None
-            no2_avg = round(sum(no2_values) / len(no2_values), 2) if no2_values else None
+            pm25_avg = round(pm25_sum / pm25_n, 2) if pm25_n else None
+            no2_avg = round(no2_sum / no2_n, 2) if no2_n else None
             
             result = {
                 "pm25": pm25_avg,
@@ -151,28 +193,45 @@ async def fetch_openaq_data(lat: float, lon: float, radius_km: int = 25) -> Opti
             }
             
             logger.info(
-                f"✅ OpenAQ v3 SUCCESS: PM2.5={pm25_avg}, NO2={no2_avg} "
-                f"from {successful_fetches} stations"
+                "✅ OpenAQ v3 SUCCESS: PM2.5=%s, NO2=%s from %s stations",
+                pm25_avg, no2_avg, successful_fetches
             )
             
             return result
                 
         except httpx.HTTPStatusError as e:
             status = e.response.status_code
-            logger.error(f"OpenAQ v3 HTTP {status} error: {e}")
+            logger.error("OpenAQ v3 HTTP %s error: %s", status, e)
             return None
         except Exception as e:
-            logger.error(f"OpenAQ v3 unexpected error: {e}")
+            logger.error("OpenAQ v3 unexpected error: %s", e)
             return None
 
 
 class OpenAQService:
     """Service for fetching air quality data from OpenAQ."""
     
+    # Built per request by the forecast route; no per-instance __dict__
+    __slots__ = ("api_key", "client")
+    
     BASE_URL = "https://api.openaq.org/v3"
     
-    def __init__(self):
+    # EPA PM2.5 -> AQI as a table: segment i covers concentrations up to
+    # and including _PM25_AQI_EDGES[i] (the last one is open-ended).
+    # Each segment is (concentration_low, aqi_low, slope)
+    _PM25_AQI_EDGES = (12.0, 35.4, 55.4, 150.4, 250.4)
+    _PM25_AQI_SEGMENTS = (
+        (0.0, 0, 50 / 12.0),
+        (12.1, 50, (100 - 50) / (35.4 - 12.1)),
+        (35.5, 100, (150 - 100) / (55.4 - 35.5)),
+        (55.5, 150, (200 - 150) / (150.4 - 55.5)),
+        (150.5, 200, (300 - 200) / (250.4 - 150.5)),
+        (250.5, 300, (500 - 300) / (500.4 - 250.5)),
+    )
+    
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
         self.api_key = settings.openaq_api_key
+        self.client = client  # shared app client; None = per-call client
     
     async def get_air_quality(
         self,
@@ -192,7 +251,7 @@ class OpenAQService:
             dict: Air quality data (PM2.5, NO2, O3, CO, etc.)
         """
         # Use the new fetch function
-        data = await fetch_openaq_data(lat, lon, radius_km=radius / 1000)
+        data = await fetch_openaq_data(lat, lon, radius_km=radius / 1000, client=self.client)
         
         if not data:
             return self._get_fallback_data()
@@ -233,7 +292,7 @@ class OpenAQService:
             list[dict]: Historical measurements
         """
         # TODO: Implement OpenAQ historical data endpoint
-        logger.info(f"Fetching {days} days of historical AQ data for ({lat}, {lon})")
+        logger.info("Fetching %s days of historical AQ data for (%s, %s)", days, lat, lon)
         
         # Mock historical data
         historical = []
@@ -249,18 +308,8 @@ class OpenAQService:
     
     def _calculate_aqi_from_pm25(self, pm25: float) -> int:
         """Calculate AQI from PM2.5 using EPA breakpoints."""
-        if pm25 <= 12.0:
-            return int((50 / 12.0) * pm25)
-        elif pm25 <= 35.4:
-            return int(50 + ((100 - 50) / (35.4 - 12.1)) * (pm25 - 12.1))
-        elif pm25 <= 55.4:
-            return int(100 + ((150 - 100) / (55.4 - 35.5)) * (pm25 - 35.5))
-        elif pm25 <= 150.4:
-            return int(150 + ((200 - 150) / (150.4 - 55.5)) * (pm25 - 55.5))
-        elif pm25 <= 250.4:
-            return int(200 + ((300 - 200) / (250.4 - 150.5)) * (pm25 - 150.5))
-        else:
-            return int(300 + ((500 - 300) / (500.4 - 250.5)) * (pm25 - 250.5))
+        c_lo, aqi_lo, slope = self._PM25_AQI_SEGMENTS[bisect.bisect_left(self._PM25_AQI_EDGES, pm25)]
+        return int(aqi_lo + slope * (pm25 - c_lo))
     
     def _get_fallback_data(self) -> dict:
         """Return safe fallback data when API fails."""
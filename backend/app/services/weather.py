@@ -1,14 +1,43 @@
 """Weather data service using NOAA and Open-Meteo."""
+import asyncio
 import httpx
 import logging
+import orjson
 from typing import Optional, List
 from datetime import datetime
 from app.config import settings
+from app.services.http import NON_RETRYABLE_STATUS, retry_delay, use_client
 
 logger = logging.getLogger(__name__)
 
+# Open-Meteo hourly variables. Callers that only need some of them can ask
+# for a subset so the API computes and sends less
+HOURLY_VARIABLES = (
+    "temperature_2m,relative_humidity_2m,wind_speed_10m,"
+    "wind_direction_10m,uv_index,precipitation,cloud_cover"
+)
+DAILY_SUMMARY_VARIABLES = "temperature_2m,uv_index,precipitation"
 
-async def fetch_weather_forecast(lat: float, lon: float, hours: int = 24) -> Optional[List[dict]]:
+# Forecast dict key, Open-Meteo hourly variable, default when missing
+_FORECAST_FIELDS = (
+    ("temp_c", "temperature_2m", 20.0),
+    ("humidity", "relative_humidity_2m", 50),
+    ("wind_speed_kmh", "wind_speed_10m", 10.0),
+    ("wind_direction", "wind_direction_10m", 180),
+    ("uv_index", "uv_index", 5.0),
+    ("precipitation_mm", "precipitation", 0.0),
+    ("cloud_cover", "cloud_cover", 30),
+)
+_FORECAST_KEYS = ("timestamp",) + tuple(key for key, _, _ in _FORECAST_FIELDS)
+
+
+async def fetch_weather_forecast(
+    lat: float,
+    lon: float,
+    hours: int = 24,
+    client: Optional[httpx.AsyncClient] = None,
+    variables: str = HOURLY_VARIABLES
+) -> Optional[List[dict]]:
     """
     Fetch hourly weather forecast.
     API: Open-Meteo (free, no key needed)
@@ -17,6 +46,9 @@ async def fetch_weather_forecast(lat: float, lon: float, hours: int = 24) -> Opt
         lat: Latitude
         lon: Longitude
         hours: Number of hours to forecast
+        client: Shared AsyncClient (a temporary one is created if omitted)
+        variables: Comma-separated Open-Meteo hourly variables to request;
+            keys for variables left out get their default values
     
     Returns:
         List of dicts with keys:
@@ -38,14 +70,14 @@ async def fetch_weather_forecast(lat: float, lon: float, hours: int = 24) -> Opt
         try:
             logger.info(f"Fetching weather forecast for ({lat}, {lon}) - Attempt {attempt + 1}/{max_retries}")
             
-            async with httpx.AsyncClient(timeout=timeout) as client:
-                response = await client.get(
+            async with use_client(client, timeout=timeout) as http:
+                response = await http.get(
                     base_url,
+                    timeout=timeout,
                     params={
                         "latitude": lat,
                         "longitude": lon,
-                        "hourly": "temperature_2m,relative_humidity_2m,wind_speed_10m,"
-                                 "wind_direction_10m,uv_index,precipitation,cloud_cover",
+                        "hourly": variables,
                         "temperature_unit": "celsius",
                         "wind_speed_unit": "kmh",
                         "precipitation_unit": "mm",
@@ -53,7 +85,7 @@ async def fetch_weather_forecast(lat: float, lon: float, hours: int = 24) -> Opt
                     }
                 )
                 response.raise_for_status()
-                data = response.json()
+                data = orjson.loads(response.content)
                 
                 hourly = data.get("hourly", {})
                 times = hourly.get("time", [])
@@ -62,19 +94,16 @@ async def fetch_weather_forecast(lat: float, lon: float, hours: int = 24) -> Opt
                     logger.warning("No hourly data in weather response")
                     return None
                 
-                # Build forecast list
-                forecast = []
-                for i in range(min(len(times), hours)):
-                    forecast.append({
-                        "timestamp": times[i],
-                        "temp_c": hourly.get("temperature_2m", [])[i] if i < len(hourly.get("temperature_2m", [])) else 20.0,
-                        "humidity": hourly.get("relative_humidity_2m", [])[i] if i < len(hourly.get("relative_humidity_2m", [])) else 50,
-                        "wind_speed_kmh": hourly.get("wind_speed_10m", [])[i] if i < len(hourly.get("wind_speed_10m", [])) else 10.0,
-                        "wind_direction": hourly.get("wind_direction_10m", [])[i] if i < len(hourly.get("wind_direction_10m", [])) else 180,
-                        "uv_index": hourly.get("uv_index", [])[i] if i < len(hourly.get("uv_index", [])) else 5.0,
-                        "precipitation_mm": hourly.get("precipitation", [])[i] if i < len(hourly.get("precipitation", [])) else 0.0,
-                        "cloud_cover": hourly.get("cloud_cover", [])[i] if i < len(hourly.get("cloud_cover", [])) else 30
-                    })
+                # Build forecast list column-wise: each variable is looked up
+                # once and padded with its default, then rows are zipped
+                n = min(len(times), hours)
+                columns = [
+                    (hourly.get(variable) or [])[:n] for _, variable, _ in _FORECAST_FIELDS
+                ]
+                for values, (_, _, default) in zip(columns, _FORECAST_FIELDS):
+                    values.extend([default] * (n - len(values)))
+                
+                forecast = [dict(zip(_FORECAST_KEYS, row)) for row in zip(times[:n], *columns)]
                 
                 logger.info(f"Weather forecast: {len(forecast)} hours fetched")
                 return forecast
@@ -84,11 +113,22 @@ async def fetch_weather_forecast(lat: float, lon: float, hours: int = 24) -> Opt
             if attempt == max_retries - 1:
                 logger.error("All weather fetch attempts timed out")
                 return None
+            await asyncio.sleep(retry_delay(attempt))
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code in NON_RETRYABLE_STATUS:
+                logger.error(f"Weather request rejected: {e}")
+                return None
+            logger.warning(f"HTTP error fetching weather: {e} (attempt {attempt + 1})")
+            if attempt == max_retries - 1:
+                logger.error(f"Failed to fetch weather after {max_retries} attempts")
+                return None
+            await asyncio.sleep(retry_delay(attempt, e.response))
         except httpx.HTTPError as e:
             logger.warning(f"HTTP error fetching weather: {e} (attempt {attempt + 1})")
             if attempt == max_retries - 1:
                 logger.error(f"Failed to fetch weather after {max_retries} attempts")
                 return None
+            await asyncio.sleep(retry_delay(attempt))
         except Exception as e:
             logger.error(f"Unexpected error fetching weather: {e}")
             return None
@@ -99,11 +139,15 @@ async def fetch_weather_forecast(lat: float, lon: float, hours: int = 24) -> Opt
 class WeatherService:
     """Service for fetching weather data."""
     
+    # Built per request by the forecast route; no per-instance __dict__
+    __slots__ = ("openweather_key", "client")
+    
     OPEN_METEO_URL = "https://api.open-meteo.com/v1/forecast"
     OPENWEATHER_URL = "https://api.openweathermap.org/data/2.5"
     
-    def __init__(self):
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
         self.openweather_key = settings.openweather_api_key
+        self.client = client  # shared app client; None = per-call client
     
     async def get_current_weather(
         self,
@@ -123,7 +167,7 @@ class WeatherService:
         logger.info(f"Fetching weather for ({lat}, {lon})")
         
         try:
-            async with httpx.AsyncClient(timeout=settings.http_timeout) as client:
+            async with use_client(self.client, settings.http_timeout) as client:
                 # TODO: Choose between OpenWeather (paid) or Open-Meteo (free)
                 # OpenWeather example:
                 # response = await client.get(
@@ -149,7 +193,7 @@ class WeatherService:
                     }
                 )
                 response.raise_for_status()
-                data = response.json()
+                data = orjson.loads(response.content)
                 
                 # Transform to consistent format
                 current = data.get("current", {})
@@ -193,7 +237,9 @@ class WeatherService:
             list[dict]: Daily forecast data
         """
         # Use hourly forecast and aggregate to daily
-        hourly_forecast = await fetch_weather_forecast(lat, lon, hours=days * 24)
+        hourly_forecast = await fetch_weather_forecast(
+            lat, lon, hours=days * 24, client=self.client, variables=DAILY_SUMMARY_VARIABLES
+        )
         
         if not hourly_forecast:
             logger.error("Failed to fetch hourly forecast for daily aggregation")
@@ -207,8 +253,9 @@ class WeatherService:
         day_precip = []
         
         for hour_data in hourly_forecast:
-            timestamp = hour_data["timestamp"]
-            date = timestamp.split("T")[0]
+            # Open-Meteo timestamps are fixed-width ISO ("2024-06-01T13:00"),
+            # so the date is a slice - no list allocation per hour
+            date = hour_data["timestamp"][:10]
             
             if current_date != date:
                 # Save previous day if exists
@@ -0,0 +1,16 @@
+-- Saved trip analyses, read and written by app/routes/trips.py.
+-- user_id is the Supabase auth user (NULL for anonymous saves).
+
+CREATE TABLE IF NOT EXISTS trips (
+    id            uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id       uuid,
+    activity      text NOT NULL,
+    location_data jsonb NOT NULL,
+    analysis_data jsonb NOT NULL,
+    created_at    timestamptz NOT NULL DEFAULT now(),
+    updated_at    timestamptz NOT NULL DEFAULT now()
+);
+
+-- list_trips: newest first, optionally filtered by user
+CREATE INDEX IF NOT EXISTS trips_user_id_created_at_idx ON trips (user_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS trips_created_at_idx ON trips (created_at DESC);
@@ -1,7 +1,18 @@
-"""Test script for business logic (risk scoring and checklist generation)."""
+"""Test script for business logic (risk scoring, checklist generation, AQI)."""
+import asyncio
 import logging
+import orjson
 from app.logic.risk_score import calculate_safety_score
 from app.logic.checklist import generate_checklist
+from app.logic.aqi import (
+    calculate_aqi_from_pm25,
+    calculate_aqi_from_no2,
+    calculate_aqi_from_pollutants,
+    get_aqi_category,
+    get_aqi_color,
+)
+from app.services.weather import fetch_weather_forecast
+from app.routes import analyze
 
 # Configure logging
 logging.basicConfig(
@@ -296,6 +307,209 @@ def test_activity_specific_modifiers():
                 print(f"                         - {warning}")
 
 
+# Pre-bisect EPA lookup (linear scan), kept as the reference for in-band values
+_REFERENCE_PM25 = [
+    (0.0, 12.0, 0, 50), (12.1, 35.4, 51, 100), (35.5, 55.4, 101, 150),
+    (55.5, 150.4, 151, 200), (150.5, 250.4, 201, 300), (250.5, 500.4, 301, 500),
+]
+_REFERENCE_NO2 = [
+    (0, 53, 0, 50), (54, 100, 51, 100), (101, 360, 101, 150),
+    (361, 649, 151, 200), (650, 1249, 201, 300), (1250, 2049, 301, 500),
+]
+
+
+def _reference_aqi(concentration, breakpoints):
+    """AQI by linear scan, or None outside every band (gaps, negatives, off-scale)."""
+    for c_lo, c_hi, i_lo, i_hi in breakpoints:
+        if c_lo <= concentration <= c_hi:
+            return round(((i_hi - i_lo) / (c_hi - c_lo)) * (concentration - c_lo) + i_lo)
+    return None
+
+
+def test_aqi_breakpoints():
+    """Test EPA AQI interpolation at band boundaries, gaps and off-scale values."""
+    
+    print("\n\n" + "=" * 70)
+    print("TESTING AQI BREAKPOINTS")
+    print("=" * 70)
+    
+    # Band boundaries
+    for pm25, expected in [(0.0, 0), (12.0, 50), (12.1, 51), (35.4, 100), (35.5, 101),
+                           (55.4, 150), (55.5, 151), (250.4, 300), (250.5, 301), (500.4, 500)]:
+        assert calculate_aqi_from_pm25(pm25) == expected, (pm25, calculate_aqi_from_pm25(pm25))
+    for no2, expected in [(0, 0), (53, 50), (54, 51), (100, 100), (101, 101),
+                          (649, 200), (650, 201), (2049, 500)]:
+        assert calculate_aqi_from_no2(no2) == expected, (no2, calculate_aqi_from_no2(no2))
+    
+    # Rounding gaps between bands interpolate in the next band up
+    # (the linear scan returned 0 here)
+    assert calculate_aqi_from_pm25(12.05) == 51
+    assert calculate_aqi_from_pm25(35.45) == 101
+    assert calculate_aqi_from_no2(53.5) == 50
+    assert calculate_aqi_from_no2(100.5) == 101
+    
+    # Negative and off-scale concentrations clamp to 0 and 500
+    assert calculate_aqi_from_pm25(-1.0) == 0
+    assert calculate_aqi_from_no2(-5) == 0
+    assert calculate_aqi_from_pm25(500.5) == 500
+    assert calculate_aqi_from_no2(3000) == 500
+    
+    # NaN readings map to 0 instead of bisecting to the top of the scale
+    assert calculate_aqi_from_pm25(float("nan")) == 0
+    assert calculate_aqi_from_no2(float("nan")) == 0
+    
+    # Negative readings are ignored when combining pollutants
+    assert calculate_aqi_from_pollutants(-1.0, -1.0) == (50, "unknown")
+    assert calculate_aqi_from_pollutants(-1.0, 53) == (50, "no2")
+    
+    # Identical to the linear scan everywhere inside a band
+    checked = 0
+    for step in range(0, 60000):
+        for value, breakpoints, calculate in [
+            (step / 100, _REFERENCE_PM25, calculate_aqi_from_pm25),
+            (step / 25, _REFERENCE_NO2, calculate_aqi_from_no2),
+        ]:
+            expected = _reference_aqi(value, breakpoints)
+            if expected is not None:
+                assert calculate(value) == expected, (value, calculate(value), expected)
+                checked += 1
+    
+    print("  ✓ Boundaries, gaps, negative and off-scale cases")
+    print(f"  ✓ {checked} in-band values match the linear scan")
+
+
+def test_aqi_categories():
+    """Test AQI category and colour lookup at and between the EPA edges."""
+    
+    print("\n\n" + "=" * 70)
+    print("TESTING AQI CATEGORIES")
+    print("=" * 70)
+    
+    # (upper AQI edge, category, colour), as in the previous if/elif chains
+    bands = [
+        (50, "Good", "#00E400"),
+        (100, "Moderate", "#FFFF00"),
+        (150, "Unhealthy for Sensitive Groups", "#FF7E00"),
+        (200, "Unhealthy", "#FF0000"),
+        (300, "Very Unhealthy", "#8F3F97"),
+        (float("inf"), "Hazardous", "#7E0023"),
+    ]
+    
+    def expected(aqi):
+        return next((category, color) for edge, category, color in bands if aqi <= edge)
+    
+    # Edges are inclusive; also fractional, negative and off-scale values
+    values = [-10, 0, 49.5, 50, 50.5, 51, 100, 101, 150, 150.1, 151, 200, 201, 300, 300.5, 301, 500, 999]
+    values += list(range(0, 600))
+    for aqi in values:
+        assert (get_aqi_category(aqi), get_aqi_color(aqi)) == expected(aqi), aqi
+    
+    print(f"  ✓ {len(values)} AQI values map to the same category and colour")
+
+
+def _reference_forecast(hourly, hours):
+    """Previous row-by-row forecast builder, kept as the reference."""
+    times = hourly.get("time", [])
+    fields = [
+        ("temp_c", "temperature_2m", 20.0),
+        ("humidity", "relative_humidity_2m", 50),
+        ("wind_speed_kmh", "wind_speed_10m", 10.0),
+        ("wind_direction", "wind_direction_10m", 180),
+        ("uv_index", "uv_index", 5.0),
+        ("precipitation_mm", "precipitation", 0.0),
+        ("cloud_cover", "cloud_cover", 30),
+    ]
+    forecast = []
+    for i in range(min(len(times), hours)):
+        row = {"timestamp": times[i]}
+        for key, variable, default in fields:
+            values = hourly.get(variable, [])
+            row[key] = values[i] if i < len(values) else default
+        forecast.append(row)
+    return forecast
+
+
+class _FakeResponse:
+    def __init__(self, payload):
+        self.content = orjson.dumps(payload)
+    
+    def raise_for_status(self):
+        pass
+
+
+class _FakeClient:
+    """Stands in for the shared AsyncClient, returning a canned Open-Meteo payload."""
+    
+    def __init__(self, payload):
+        self.payload = payload
+    
+    async def get(self, *args, **kwargs):
+        return _FakeResponse(self.payload)
+
+
+def test_weather_forecast_columns():
+    """Test the column-wise forecast builder against the row-by-row version."""
+    
+    print("\n\n" + "=" * 70)
+    print("TESTING WEATHER FORECAST ASSEMBLY")
+    print("=" * 70)
+    
+    times = [f"2025-09-20T{h:02d}:00" for h in range(6)]
+    layouts = {
+        "complete": {
+            "time": times,
+            "temperature_2m": [18.5, 19.0, 19.4, 20.1, 21.0, 21.8],
+            "relative_humidity_2m": [80, 78, 75, 70, 66, 60],
+            "wind_speed_10m": [5.0, 6.1, 7.2, 8.0, 9.5, 10.3],
+            "wind_direction_10m": [170, 175, 180, 185, 190, 200],
+            "uv_index": [0.0, 0.0, 0.5, 1.5, 3.0, 4.5],
+            "precipitation": [0.0, 0.2, 0.0, 0.0, 0.1, 0.0],
+            "cloud_cover": [90, 80, 60, 40, 20, 10],
+        },
+        "short and missing columns": {
+            "time": times,
+            "temperature_2m": [18.5, 19.0],
+            "relative_humidity_2m": [],
+            "uv_index": [0.0, 0.0, 0.5, 1.5, 3.0, 4.5, 6.0],
+        },
+        "null values": {
+            "time": times,
+            "temperature_2m": [18.5, None, 19.4, None, 21.0, 21.8],
+            "cloud_cover": [None] * 6,
+        },
+    }
+    
+    for name, hourly in layouts.items():
+        for hours in (1, 4, 6, 24):
+            forecast = asyncio.run(fetch_weather_forecast(
+                0.0, 0.0, hours=hours, client=_FakeClient({"hourly": hourly})
+            ))
+            assert forecast == _reference_forecast(hourly, hours), (name, hours)
+        print(f"  ✓ {name}: matches the row-by-row builder")
+    
+    # No timestamps: no forecast
+    assert asyncio.run(fetch_weather_forecast(0.0, 0.0, client=_FakeClient({"hourly": {}}))) is None
+
+
+def test_analyze_response_struct_parity():
+    """Test that the msgspec response structs mirror the Pydantic response models."""
+    
+    print("\n\n" + "=" * 70)
+    print("TESTING ANALYZE RESPONSE SCHEMA PARITY")
+    print("=" * 70)
+    
+    pairs = [
+        (analyze.AnalyzeResponseStruct, analyze.AnalyzeResponse),
+        (analyze.AirQualityStruct, analyze.AirQualityResponse),
+        (analyze.WeatherHourStruct, analyze.WeatherHourResponse),
+        (analyze.ChecklistItemStruct, analyze.ChecklistItemResponse),
+        (analyze.OverallSafetyStruct, analyze.OverallSafetyResponse),
+    ]
+    for struct, model in pairs:
+        assert struct.__struct_fields__ == tuple(model.model_fields), (struct.__name__, model.__name__)
+        print(f"  ✓ {struct.__name__} matches {model.__name__}")
+
+
 if __name__ == "__main__":
     print("\n🧪 SafeOutdoor Business Logic Test Suite\n")
     
@@ -303,6 +517,10 @@ if __name__ == "__main__":
     test_risk_scoring()
     test_checklist_generation()
     test_activity_specific_modifiers()
+    test_aqi_breakpoints()
+    test_aqi_categories()
+    test_weather_forecast_columns()
+    test_analyze_response_struct_parity()
     
     print("\n\n" + "=" * 70)
     print("✅ All tests completed!")
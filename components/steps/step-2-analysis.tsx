@@ -8,7 +8,7 @@ import { Button } from "@/components/ui/button"
 import { Card } from "@/components/ui/card"
 import { AlertCircle } from "lucide-react"
 import { getLoadingItems, getMockSafetyAnalysis } from "@/lib/mock-data"
-import { analyzeAdventure, type AnalyzeRequest, type AnalyzeResponse } from "@/lib/api"
+import { analyzeAdventure, waitForAnalysisSummary, type AnalyzeRequest, type AnalyzeResponse } from "@/lib/api"
 import type { AdventureContext, SafetyAnalysis } from "@/lib/types"
 
 interface Step2AnalysisProps {
@@ -16,9 +16,10 @@ interface Step2AnalysisProps {
   onBack: () => void
   adventureContext: AdventureContext | null
   onAnalysisComplete: (analysis: SafetyAnalysis) => void
+  onSummaryReady: (requestId: string, summary: string) => void
 }
 
-export function Step2Analysis({ onNext, onBack, adventureContext, onAnalysisComplete }: Step2AnalysisProps) {
+export function Step2Analysis({ onNext, onBack, adventureContext, onAnalysisComplete, onSummaryReady }: Step2AnalysisProps) {
   const [progress, setProgress] = useState<Record<string, number>>({})
   const [showScore, setShowScore] = useState(false)
   const [isLoading, setIsLoading] = useState(true)
@@ -34,6 +35,7 @@ export function Step2Analysis({ onNext, onBack, adventureContext, onAnalysisComp
     console.log('📊 AI Summary length:', data.ai_summary?.length || 0)
     
     return {
+      request_id: data.request_id,
       score: Math.round(data.risk_score * 10), // Convert 0-10 to 0-100 scale
       category: data.category,
       ai_summary: data.ai_summary, // ✅ PRESERVE AI SUMMARY
@@ -129,6 +131,13 @@ export function Step2Analysis({ onNext, onBack, adventureContext, onAnalysisComp
 
         // Convert to SafetyAnalysis format
         const safetyAnalysis = convertToSafetyAnalysis(data)
+
+        // The response carries a template summary; the OpenAI one is generated
+        // in the background. Not tied to isMounted: it should still reach
+        // Step 4 after the user moves on (the parent matches request_id)
+        waitForAnalysisSummary(data.request_id).then((summary) => {
+          if (summary) onSummaryReady(data.request_id, summary)
+        })
         
         // Wait a moment to show the loading animation
         setTimeout(() => {
@@ -146,6 +146,48 @@ export async function analyzeAdventure(data: AnalyzeRequest): Promise<AnalyzeRes
   }
 }
 
+/**
+ * Poll for the background AI summary of a previous analysis
+ */
+export async function getAnalysisSummary(
+  requestId: string
+): Promise<{ ready: boolean; summary: string | null }> {
+  try {
+    const response = await apiClient.get(`/api/analyze/${requestId}/summary`);
+    return response.data;
+  } catch (error) {
+    if (axios.isAxiosError(error)) {
+      const message = error.response?.data?.detail || error.message;
+      throw new Error(`Summary fetch failed: ${message}`);
+    }
+    throw error;
+  }
+}
+
+/**
+ * Poll until the background AI summary is ready.
+ * Resolves to null if it isn't ready after `attempts` polls or a poll fails.
+ */
+export async function waitForAnalysisSummary(
+  requestId: string,
+  attempts: number = 10,
+  intervalMs: number = 1500
+): Promise<string | null> {
+  for (let attempt = 0; attempt < attempts; attempt++) {
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
+    try {
+      const { ready, summary } = await getAnalysisSummary(requestId);
+      if (ready && summary) {
+        return summary;
+      }
+    } catch (error) {
+      console.warn('[API] AI summary poll failed:', error);
+      return null;
+    }
+  }
+  return null;
+}
+
 /**
  * Get multi-day forecast for location
  */
@@ -72,6 +72,7 @@ export interface RouteSegmentData {
 export interface SafetyAnalysis {
   score: number
   category?: string
+  request_id?: string // Backend analysis ID (for polling the AI summary)
   ai_summary?: string // OpenAI-generated summary
   overallSafety?: {
     environmental: number